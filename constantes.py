@@ -0,0 +1,43 @@
+# constantes.py
+# --- Regras de Pagamento dos Jogos e Configuração Padrão ---
+# Usadas pelos comandos (main.py, jogos_complexos.py) e pelo simulador de RTP (simulador.py),
+# para que a simulação sempre siga as mesmas regras do bot.
+
+HAPPY_HOUR_MULTIPLICADOR = 1.3
+
+# Configuração padrão do bot (gravada no banco na primeira execução; os admins mudam depois)
+JACKPOT_INICIAL = 100000    # Valor para o qual o jackpot volta depois de pago
+CONFIG_PADRAO = {'jackpot': str(JACKPOT_INICIAL), 'taxa_casa': '0.05', 'max_aposta': '50000', 'taxa_jackpot': '0.01'}
+
+# Cara ou Coroa
+COIN_MULTIPLICADOR = 2.0
+
+# Caça-níquel: (símbolo, peso, multiplicador para três iguais)
+SLOT_EMOJIS = [
+    ("🍒", 10, 3.0), ("🍋", 10, 3.0), ("🍉", 8,  5.0),
+    ("⭐", 5,  10.0), ("💎", 3,  25.0), ("💰", 1,  0)
+]
+SLOTS_SIMBOLO_JACKPOT = "💰"
+SLOTS_DEVOLUCAO_PAR = 0.5   # Fração da aposta devolvida com dois símbolos iguais
+
+# Roleta (0 a 36)
+CORES_ROLETA = {
+    'vermelho': {'multi': 2, 'numeros': [1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36]},
+    'preto':    {'multi': 2, 'numeros': [2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35]},
+    'verde':    {'multi': 14, 'numeros': [0]}
+}
+
+# Blackjack
+NAIPES = ['❤️', '♦️', '♣️', '♠️']
+VALORES_CARTAS = {
+    'A': 11, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'J': 10, 'Q': 10, 'K': 10
+}
+BLACKJACK_PAGAMENTO = 2.0          # Vitória comum
+BLACKJACK_PAGAMENTO_NATURAL = 2.5  # 21 com as duas primeiras cartas
+DEALER_PARA_EM = 17                # O dealer compra enquanto tiver menos que isso (para no 17 macio)
+
+# Crash: crash_point = CRASH_FATOR / max(CRASH_EXP_MINIMO, Exp(1)) + CRASH_MINIMO
+CRASH_CRESCIMENTO = 0.12     # O multiplicador vale e^(k*t), com t em segundos desde o início da rodada
+CRASH_FATOR = 2.0
+CRASH_EXP_MINIMO = 0.01
+CRASH_MINIMO = 1.01
@@ -1,154 +1,818 @@
 # database.py
 import sqlite3
 import datetime
+import queue
+import threading
+import asyncio
+import functools
+import bisect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import metricas
+from constantes import CONFIG_PADRAO, JACKPOT_INICIAL
 
 DB_NAME = "cassino.db"
 
+# --- Configuração das Conexões ---
+READ_POOL_SIZE = 4          # Conexões somente-leitura mantidas abertas (ranking, logs)
+CACHED_STATEMENTS = 256     # Statements preparados mantidos em cache por conexão
+
+# Tipo de cada valor da configuração (a tabela guarda tudo como texto; os padrões ficam em constantes.py)
+CONFIG_TIPOS = {'jackpot': int, 'taxa_casa': float, 'max_aposta': int, 'taxa_jackpot': float}
+
+LOG_BATCH_SIZE = 200        # Máximo de logs gravados por transação
+LOG_FLUSH_MS = 250          # Tempo máximo que um log espera no buffer
+LOG_QUEUE_MAX = 10000       # Acima disso, db_log espera (backpressure)
+RANKING_BLOCO = 512         # Tamanho alvo dos blocos do ranking em memória (divide ao passar do dobro)
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",      # Leitores não esperam pelo escritor
+    "PRAGMA synchronous = NORMAL",    # Seguro com WAL e bem mais barato que FULL
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",     # ~16 MB de cache de páginas
+    "PRAGMA busy_timeout = 5000",
+)
+
+_write_conn = None
+_write_lock = threading.RLock()
+_read_pool = queue.LifoQueue(maxsize=READ_POOL_SIZE)
+
+# Todo I/O do SQLite roda fora do event loop: uma thread dedicada para escritas
+# (fila serializada, dona da conexão de escrita) e um pequeno pool para leituras.
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_readers = ThreadPoolExecutor(max_workers=READ_POOL_SIZE, thread_name_prefix="db-reader")
+
+_thread_local = threading.local() # Função do DB rodando em cada thread (para contar os commits)
+
+def _executar(nome, func, args, kwargs):
+    _thread_local.funcao = nome
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _thread_local.funcao = None
+
+def _run_in(executor):
+    """Transforma uma função síncrona do DB em uma corrotina executada no executor indicado."""
+    def decorator(func):
+        nome = func.__name__
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            metricas.DB_CHAMADAS.inc(nome)
+            inicio = time.perf_counter()
+            try:
+                return await loop.run_in_executor(executor, functools.partial(_executar, nome, func, args, kwargs))
+            finally:
+                metricas.DB_DURACAO.observar(time.perf_counter() - inicio, nome)
+        return wrapper
+    return decorator
+
+writer_task = _run_in(_writer)
+reader_task = _run_in(_readers)
+
 # --- 3. Funções do Banco de Dados (SQLite) ---
 print("Configurando funções de banco de dados...")
 
-def init_db():
-    """Cria todas as tabelas necessárias no banco de dados."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS usuarios (
-        user_id INTEGER PRIMARY KEY,
-        carteira INTEGER DEFAULT 100,
-        banco INTEGER DEFAULT 0,
-        daily_streak INTEGER DEFAULT 0,
-        last_daily TEXT DEFAULT '2000-01-01 00:00:00' 
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS stats (
-        user_id INTEGER PRIMARY KEY,
-        vitorias INTEGER DEFAULT 0,
-        derrotas INTEGER DEFAULT 0,
-        FOREIGN KEY (user_id) REFERENCES usuarios (user_id)
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS bot_config (
-        config_key TEXT PRIMARY KEY,
-        config_value TEXT
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS logs (
-        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        action TEXT,
-        details TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-
-    default_config = [
-        ('jackpot', '100000'), ('taxa_casa', '0.05'),
-        ('max_aposta', '50000'), ('taxa_jackpot', '0.01')
-    ]
-    cursor.executemany("INSERT OR IGNORE INTO bot_config (config_key, config_value) VALUES (?, ?)", default_config)
-
-    conn.commit()
-    conn.close()
-    print("Banco de dados inicializado.")
+class _ConexaoEscrita(sqlite3.Connection):
+    """Conexão de escrita que conta os commits por função do DB."""
+    def commit(self):
+        super().commit()
+        metricas.DB_COMMITS.inc(getattr(_thread_local, "funcao", None) or "?")
 
-async def check_user(user_id: int):
-    """Verifica se um usuário existe no DB. Se não, cria um registro."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM usuarios WHERE user_id = ?", (user_id,))
-    if cursor.fetchone() is None:
-        cursor.execute("INSERT INTO usuarios (user_id, carteira) VALUES (?, ?)", (user_id, 100))
+def _open_write_conn():
+    """Abre a conexão de escrita de longa duração com os pragmas ajustados."""
+    conn = sqlite3.connect(DB_NAME, cached_statements=CACHED_STATEMENTS, check_same_thread=False, factory=_ConexaoEscrita)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _open_read_conn():
+    """Abre uma conexão somente-leitura (não bloqueia nem é bloqueada pelo escritor no modo WAL)."""
+    conn = sqlite3.connect(f"file:{DB_NAME}?mode=ro", uri=True, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+    for pragma in PRAGMAS[2:]:
+        conn.execute(pragma)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+@contextmanager
+def write_conn():
+    """Fornece a conexão de escrita compartilhada (serializada por um lock)."""
+    global _write_conn
+    with _write_lock:
+        if _write_conn is None:
+            _write_conn = _open_write_conn()
+        yield _write_conn
+
+@contextmanager
+def read_conn():
+    """Empresta uma conexão do pool somente-leitura e a devolve ao final."""
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = _open_read_conn()
+    try:
+        yield conn
+    finally:
+        try:
+            _read_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+def _close_connections():
+    """Fecha a conexão de escrita e todas as conexões do pool de leitura."""
+    global _write_conn
+    with _write_lock:
+        if _write_conn is not None:
+            _write_conn.close()
+            _write_conn = None
+    while True:
+        try:
+            _read_pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+async def init_db():
+    """Cria todas as tabelas necessárias no banco de dados e carrega a configuração em memória.
+    Roda uma vez só, no setup_hook (recarregar o jackpot depois apagaria as contribuições em memória)."""
+    await _init_db()
+    _config.update(await _load_config())
+    # O jackpot não fica no cache de config: quem manda nele é o acumulador
+    _jackpot.carregar(_config.pop('jackpot'))
+    _ranking.carregar(await _load_totais())
+
+@writer_task
+def _init_db():
+    with write_conn() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            user_id INTEGER PRIMARY KEY,
+            carteira INTEGER DEFAULT 100,
+            banco INTEGER DEFAULT 0,
+            daily_streak INTEGER DEFAULT 0,
+            last_daily TEXT DEFAULT '2000-01-01 00:00:00',
+            total INTEGER GENERATED ALWAYS AS (carteira + banco) VIRTUAL
+        )
+        """)
+
+        # Bancos antigos não têm a coluna total (gerada e indexada, usada pelo ranking)
+        colunas = [row[1] for row in cursor.execute("PRAGMA table_xinfo(usuarios)")]
+        if 'total' not in colunas:
+            cursor.execute("ALTER TABLE usuarios ADD COLUMN total INTEGER GENERATED ALWAYS AS (carteira + banco) VIRTUAL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_total ON usuarios (total DESC)")
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats (
+            user_id INTEGER PRIMARY KEY,
+            vitorias INTEGER DEFAULT 0,
+            derrotas INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES usuarios (user_id)
+        )
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bot_config (
+            config_key TEXT PRIMARY KEY,
+            config_value TEXT
+        )
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS logs (
+            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT,
+            details TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
 
-    cursor.execute("SELECT * FROM stats WHERE user_id = ?", (user_id,))
-    if cursor.fetchone() is None:
-        cursor.execute("INSERT INTO stats (user_id) VALUES (?)", (user_id,))
+        # Quem está em cada servidor (só jogadores), para o ranking por servidor
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS guild_members (
+            guild_id INTEGER,
+            user_id INTEGER,
+            PRIMARY KEY (guild_id, user_id)
+        ) WITHOUT ROWID
+        """)
 
-    conn.commit()
-    conn.close()
+        cursor.executemany("INSERT OR IGNORE INTO bot_config (config_key, config_value) VALUES (?, ?)", CONFIG_PADRAO.items())
 
+        conn.commit()
+    print("Banco de dados inicializado.")
+
+def _ensure_user(conn, user_id: int):
+    """Cria os registros de usuário e stats (se não existirem) usando a conexão fornecida."""
+    if conn.execute("INSERT OR IGNORE INTO usuarios (user_id, carteira) VALUES (?, ?)", (user_id, 100)).rowcount:
+        _ranking.atualizar(user_id, 100)
+    conn.execute("INSERT OR IGNORE INTO stats (user_id) VALUES (?)", (user_id,))
+
+@writer_task
+def check_user(user_id: int):
+    """Verifica se um usuário existe no DB. Se não, cria um registro."""
+    with write_conn() as conn:
+        _ensure_user(conn, user_id)
+        conn.commit()
+
+@writer_task
 def get_balance(user_id: int):
     """Pega o saldo (carteira e banco) de um usuário."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT carteira, banco FROM usuarios WHERE user_id = ?", (user_id,))
-    data = cursor.fetchone()
-    conn.close()
+    with write_conn() as conn:
+        data = conn.execute("SELECT carteira, banco FROM usuarios WHERE user_id = ?", (user_id,)).fetchone()
     if data:
         return {'carteira': data[0], 'banco': data[1]}
     return None
 
-def update_balance(user_id: int, carteira: int, banco: int):
-    """Atualiza o saldo (carteira e banco) de um usuário."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE usuarios SET carteira = ?, banco = ? WHERE user_id = ?", (carteira, banco, user_id))
-    conn.commit()
-    conn.close()
+def _balance_dict(row):
+    return {'carteira': row[0], 'banco': row[1]} if row else None
+
+def _balance_changed(user_id: int, rows):
+    """Repassa o saldo devolvido por um RETURNING carteira, banco para o ranking em memória."""
+    if rows:
+        _ranking.atualizar(user_id, rows[0][0] + rows[0][1])
+    return _balance_dict(rows[0] if rows else None)
 
-async def update_stats(user_id: int, vitorias_add: int = 0, derrotas_add: int = 0):
+@writer_task
+def add_balance(user_id: int, carteira_delta: int = 0, banco_delta: int = 0):
+    """Aplica deltas atômicos à carteira e ao banco. Retorna o novo saldo, ou None se algum ficaria negativo."""
+    with write_conn() as conn:
+        rows = conn.execute(
+            "UPDATE usuarios SET carteira = carteira + ?, banco = banco + ? "
+            "WHERE user_id = ? AND carteira >= ? AND banco >= ? RETURNING carteira, banco",
+            (carteira_delta, banco_delta, user_id, max(0, -carteira_delta), max(0, -banco_delta))
+        ).fetchall()
+        conn.commit()
+    return _balance_changed(user_id, rows)
+
+@writer_task
+def settle_bet(user_id: int, aposta: int, ganhos: int, vitorias_add: int = 0, derrotas_add: int = 0):
+    """Liquida uma aposta em um único UPDATE (debita a aposta e credita os ganhos) e atualiza as stats.
+    Retorna o novo saldo, ou None se a carteira não cobre mais a aposta."""
+    with write_conn() as conn:
+        rows = conn.execute(
+            "UPDATE usuarios SET carteira = carteira - ? + ? WHERE user_id = ? AND carteira >= ? RETURNING carteira, banco",
+            (aposta, ganhos, user_id, aposta)
+        ).fetchall()
+        if rows and (vitorias_add or derrotas_add):
+            conn.execute(
+                "UPDATE stats SET vitorias = vitorias + ?, derrotas = derrotas + ? WHERE user_id = ?",
+                (vitorias_add, derrotas_add, user_id)
+            )
+        conn.commit()
+    return _balance_changed(user_id, rows)
+
+@writer_task
+def transfer(from_id: int, to_id: int, amount: int):
+    """Transfere dinheiro entre carteiras em uma única transação. Retorna o novo saldo do pagador, ou None."""
+    with write_conn() as conn:
+        rows = conn.execute(
+            "UPDATE usuarios SET carteira = carteira - ? WHERE user_id = ? AND carteira >= ? RETURNING carteira, banco",
+            (amount, from_id, amount)
+        ).fetchall()
+        if not rows:
+            conn.rollback()
+            return None
+        _ensure_user(conn, to_id) # Sem o registro do recebedor, o débito seria gravado e o dinheiro sumiria
+        to_rows = conn.execute("UPDATE usuarios SET carteira = carteira + ? WHERE user_id = ? RETURNING carteira, banco", (amount, to_id)).fetchall()
+        conn.commit()
+    _balance_changed(to_id, to_rows)
+    return _balance_changed(from_id, rows)
+
+@writer_task
+def settle_duel(ganhador_id: int, perdedor_id: int, aposta: int, premio: int):
+    """Debita a aposta dos dois duelistas, paga o prêmio ao ganhador e atualiza as stats em uma transação.
+    Retorna False (sem alterar nada) se algum dos dois não tiver mais a aposta na carteira."""
+    with write_conn() as conn:
+        debitados = conn.execute(
+            "UPDATE usuarios SET carteira = carteira - ? WHERE user_id IN (?, ?) AND carteira >= ? RETURNING user_id, carteira, banco",
+            (aposta, ganhador_id, perdedor_id, aposta)
+        ).fetchall()
+        if len(debitados) != 2:
+            conn.rollback()
+            return False
+        ganhador_rows = conn.execute("UPDATE usuarios SET carteira = carteira + ? WHERE user_id = ? RETURNING carteira, banco", (premio, ganhador_id)).fetchall()
+        conn.execute("UPDATE stats SET vitorias = vitorias + 1 WHERE user_id = ?", (ganhador_id,))
+        conn.execute("UPDATE stats SET derrotas = derrotas + 1 WHERE user_id = ?", (perdedor_id,))
+        conn.commit()
+    _balance_changed(ganhador_id, ganhador_rows)
+    _balance_changed(perdedor_id, [row[1:] for row in debitados if row[0] == perdedor_id])
+    return True
+
+@writer_task
+def update_stats(user_id: int, vitorias_add: int = 0, derrotas_add: int = 0):
     """Adiciona vitórias ou derrotas às estatísticas de um usuário."""
-    await check_user(user_id)
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE stats SET vitorias = vitorias + ?, derrotas = derrotas + ? WHERE user_id = ?",
-        (vitorias_add, derrotas_add, user_id)
-    )
-    conn.commit()
-    conn.close()
+    with write_conn() as conn:
+        _ensure_user(conn, user_id)
+        conn.execute(
+            "UPDATE stats SET vitorias = vitorias + ?, derrotas = derrotas + ? WHERE user_id = ?",
+            (vitorias_add, derrotas_add, user_id)
+        )
+        conn.commit()
+
+@writer_task
+def settle_crash_round(perdedores, action: str, details: str):
+    """Fecha uma rodada de Crash em uma transação: uma derrota para cada perdedor (UPDATE único)
+    e um único log agregado da rodada."""
+    with write_conn() as conn:
+        conn.execute(
+            "UPDATE stats SET derrotas = derrotas + 1 WHERE user_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(perdedores)),)
+        )
+        conn.execute(
+            "INSERT INTO logs (user_id, action, details) VALUES (NULL, ?, ?)",
+            (action, details)
+        )
+        conn.commit()
+
+@writer_task
+def settle_crash_cashouts(pagamentos, action: str, details: str):
+    """Paga de uma vez todos os saques automáticos de um tick do Crash: um UPDATE para as carteiras,
+    um para as vitórias e um log agregado, tudo em uma transação. `pagamentos` é uma lista de (user_id, ganhos)."""
+    pagamentos_json = json.dumps([[user_id, ganhos] for user_id, ganhos in pagamentos])
+    with write_conn() as conn:
+        rows = conn.execute("""
+            UPDATE usuarios SET carteira = carteira + p.value ->> 1
+            FROM json_each(?) AS p
+            WHERE usuarios.user_id = p.value ->> 0
+            RETURNING usuarios.user_id, usuarios.carteira, usuarios.banco
+        """, (pagamentos_json,)).fetchall()
+        conn.execute(
+            "UPDATE stats SET vitorias = vitorias + 1 WHERE user_id IN (SELECT value ->> 0 FROM json_each(?))",
+            (pagamentos_json,)
+        )
+        conn.execute(
+            "INSERT INTO logs (user_id, action, details) VALUES (NULL, ?, ?)",
+            (action, details)
+        )
+        conn.commit()
+    for user_id, carteira, banco in rows:
+        _ranking.atualizar(user_id, carteira + banco)
+
+@writer_task
+def settle_results(resultados, action: str, details: str):
+    """Liquida vários jogos cujas apostas já foram debitadas (assentos de uma mesa, jogos restaurados do diário)
+    em uma transação. `resultados` é uma lista de (user_id, ganhos, vitorias_add, derrotas_add)."""
+    # O UPDATE ... FROM aplica só uma linha de origem por usuário: somamos antes os jogos de um mesmo jogador
+    somados = {}
+    for user_id, ganhos, vitorias_add, derrotas_add in resultados:
+        total = somados.setdefault(user_id, [user_id, 0, 0, 0])
+        total[1] += ganhos
+        total[2] += vitorias_add
+        total[3] += derrotas_add
+    resultados_json = json.dumps(list(somados.values()))
+    with write_conn() as conn:
+        rows = conn.execute("""
+            UPDATE usuarios SET carteira = carteira + r.value ->> 1
+            FROM json_each(?) AS r
+            WHERE usuarios.user_id = r.value ->> 0 AND r.value ->> 1 > 0
+            RETURNING usuarios.user_id, usuarios.carteira, usuarios.banco
+        """, (resultados_json,)).fetchall()
+        conn.execute("""
+            UPDATE stats SET vitorias = vitorias + r.value ->> 2, derrotas = derrotas + r.value ->> 3
+            FROM json_each(?) AS r
+            WHERE stats.user_id = r.value ->> 0
+        """, (resultados_json,))
+        conn.execute(
+            "INSERT INTO logs (user_id, action, details) VALUES (NULL, ?, ?)",
+            (action, details)
+        )
+        conn.commit()
+    for user_id, carteira, banco in rows:
+        _ranking.atualizar(user_id, carteira + banco)
+
+@writer_task
+def get_daily(user_id: int):
+    """Busca (last_daily, daily_streak, carteira, banco) de um usuário."""
+    with write_conn() as conn:
+        return conn.execute("SELECT last_daily, daily_streak, carteira, banco FROM usuarios WHERE user_id = ?", (user_id,)).fetchone()
+
+@writer_task
+def claim_daily(user_id: int, recompensa: int, streak: int, last_daily_antigo: str, last_daily_novo: str):
+    """Credita o daily só se last_daily ainda for o valor lido (evita coleta dupla). Retorna a nova carteira ou None."""
+    with write_conn() as conn:
+        rows = conn.execute(
+            "UPDATE usuarios SET carteira = carteira + ?, daily_streak = ?, last_daily = ? "
+            "WHERE user_id = ? AND last_daily = ? RETURNING carteira, banco",
+            (recompensa, streak, last_daily_novo, user_id, last_daily_antigo)
+        ).fetchall()
+        conn.commit()
+    _balance_changed(user_id, rows)
+    return rows[0][0] if rows else None
+
+@reader_task
+def get_profile(user_id: int):
+    """Busca (carteira, banco, daily_streak, vitorias, derrotas) de um usuário."""
+    with read_conn() as conn:
+        return conn.execute("""
+            SELECT u.carteira, u.banco, u.daily_streak, s.vitorias, s.derrotas
+            FROM usuarios u JOIN stats s ON s.user_id = u.user_id
+            WHERE u.user_id = ?
+        """, (user_id,)).fetchone()
+
+# --- Ranking em Memória ---
+class Ranking:
+    """Totais (carteira + banco) de todos os jogadores em blocos ordenados de até 2*RANKING_BLOCO entradas,
+    com uma árvore de Fenwick sobre o tamanho dos blocos. Mudar um saldo ou achar a posição de alguém custa
+    O(log n) (mais uma inserção dentro de um bloco pequeno); `totais` diz quem já joga."""
+    def __init__(self):
+        self.totais = {}
+        self.blocos = []   # Listas de (-total, user_id), do mais rico para o mais pobre
+        self.maximos = []  # Última chave de cada bloco, para a busca binária do bloco
+        self.arvore = [0]  # Fenwick (1-indexada) com o tamanho de cada bloco
+        self._lock = threading.Lock()
+
+    def carregar(self, rows):
+        with self._lock:
+            self.totais = dict(rows)
+            ordem = sorted((-total, user_id) for user_id, total in self.totais.items())
+            self.blocos = [ordem[i:i + RANKING_BLOCO] for i in range(0, len(ordem), RANKING_BLOCO)]
+            self._reconstruir()
+
+    def _reconstruir(self):
+        """Refaz os máximos e a árvore em O(blocos) (só ao carregar, dividir ou esvaziar um bloco)."""
+        self.maximos = [bloco[-1] for bloco in self.blocos]
+        n = len(self.blocos)
+        self.arvore = [0] * (n + 1)
+        for k in range(1, n + 1):
+            self.arvore[k] += len(self.blocos[k - 1])
+            pai = k + (k & -k)
+            if pai <= n:
+                self.arvore[pai] += self.arvore[k]
+
+    def _somar(self, i, delta):
+        k = i + 1
+        while k < len(self.arvore):
+            self.arvore[k] += delta
+            k += k & -k
+
+    def _antes_do_bloco(self, i):
+        """Quantas chaves existem nos blocos anteriores ao bloco i."""
+        soma = 0
+        while i > 0:
+            soma += self.arvore[i]
+            i -= i & -i
+        return soma
+
+    def _inserir(self, chave):
+        if not self.blocos:
+            self.blocos = [[chave]]
+            self._reconstruir()
+            return
+        i = min(bisect.bisect_left(self.maximos, chave), len(self.blocos) - 1)
+        bloco = self.blocos[i]
+        bisect.insort(bloco, chave)
+        self.maximos[i] = bloco[-1]
+        if len(bloco) > 2 * RANKING_BLOCO:
+            self.blocos[i:i + 1] = [bloco[:RANKING_BLOCO], bloco[RANKING_BLOCO:]]
+            self._reconstruir()
+        else:
+            self._somar(i, 1)
+
+    def _remover(self, chave):
+        i = bisect.bisect_left(self.maximos, chave)
+        bloco = self.blocos[i]
+        del bloco[bisect.bisect_left(bloco, chave)]
+        if not bloco:
+            del self.blocos[i]
+            self._reconstruir()
+        else:
+            self.maximos[i] = bloco[-1]
+            self._somar(i, -1)
+
+    def atualizar(self, user_id: int, total: int):
+        with self._lock:
+            antigo = self.totais.get(user_id)
+            if antigo == total:
+                return
+            if antigo is not None:
+                self._remover((-antigo, user_id))
+            self._inserir((-total, user_id))
+            self.totais[user_id] = total
+
+    def posicao(self, user_id: int):
+        with self._lock:
+            total = self.totais.get(user_id)
+            if total is None:
+                return None
+            chave = (-total, user_id)
+            i = bisect.bisect_left(self.maximos, chave)
+            return self._antes_do_bloco(i) + bisect.bisect_left(self.blocos[i], chave) + 1
+
+    def limpar(self):
+        with self._lock:
+            self.totais = {}
+            self.blocos = []
+            self._reconstruir()
+
+_ranking = Ranking()
+
+@writer_task
+def _load_totais():
+    with write_conn() as conn:
+        return conn.execute("SELECT user_id, total FROM usuarios ORDER BY total DESC").fetchall()
+
+async def get_rank_position(user_id: int):
+    """Posição de um jogador no ranking global (1 = mais rico), ou None se ele não tiver registro."""
+    return _ranking.posicao(user_id)
+
+def is_player(user_id: int) -> bool:
+    """Diz se o usuário já tem registro no cassino (consulta o ranking em memória)."""
+    return user_id in _ranking.totais
+
+# --- Membros por Servidor ---
+# Membros já gravados de cada servidor, para a atividade de comandos não virar uma escrita por comando.
+_membros_conhecidos = {} # guild_id -> set(user_id)
+
+async def add_guild_member(guild_id: int, user_id: int):
+    """Registra que um usuário está em um servidor (sem custo se já for conhecido)."""
+    membros = _membros_conhecidos.setdefault(guild_id, set())
+    if user_id in membros:
+        return
+    membros.add(user_id)
+    await _add_guild_member(guild_id, user_id)
+
+@writer_task
+def _add_guild_member(guild_id: int, user_id: int):
+    with write_conn() as conn:
+        conn.execute("INSERT OR IGNORE INTO guild_members (guild_id, user_id) VALUES (?, ?)", (guild_id, user_id))
+        conn.commit()
+
+async def remove_guild_member(guild_id: int, user_id: int):
+    """Remove um usuário da lista de membros de um servidor (ele saiu)."""
+    _membros_conhecidos.get(guild_id, set()).discard(user_id)
+    await _remove_guild_member(guild_id, user_id)
+
+@writer_task
+def _remove_guild_member(guild_id: int, user_id: int):
+    with write_conn() as conn:
+        conn.execute("DELETE FROM guild_members WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+        conn.commit()
+
+async def sync_guild_members(guild_id: int, user_ids):
+    """Substitui a lista de membros de um servidor (usado ao conectar e ao entrar em um servidor)."""
+    user_ids = list(user_ids)
+    if user_ids:
+        _membros_conhecidos[guild_id] = set(user_ids)
+    else:
+        _membros_conhecidos.pop(guild_id, None)
+    await _sync_guild_members(guild_id, user_ids)
+
+@writer_task
+def _sync_guild_members(guild_id: int, user_ids):
+    with write_conn() as conn:
+        conn.execute("DELETE FROM guild_members WHERE guild_id = ?", (guild_id,))
+        conn.executemany("INSERT OR IGNORE INTO guild_members (guild_id, user_id) VALUES (?, ?)", ((guild_id, user_id) for user_id in user_ids))
+        conn.commit()
+
+@reader_task
+def get_guild_top_users(guild_id: int, limit: int = 10):
+    """Busca os N jogadores mais ricos de um servidor (join indexado guild_members x usuarios)."""
+    with read_conn() as conn:
+        return conn.execute("""
+            SELECT u.user_id, u.total FROM guild_members g
+            JOIN usuarios u ON u.user_id = g.user_id
+            WHERE g.guild_id = ?
+            ORDER BY u.total DESC LIMIT ?
+        """, (guild_id, limit)).fetchall()
+
+@reader_task
+def get_guild_rank_position(guild_id: int, user_id: int):
+    """Posição de um jogador no ranking de um servidor, ou None se ele não tiver registro."""
+    with read_conn() as conn:
+        row = conn.execute("""
+            SELECT COUNT(*) + 1 FROM guild_members g
+            JOIN usuarios u ON u.user_id = g.user_id
+            WHERE g.guild_id = ? AND u.total > (SELECT total FROM usuarios WHERE user_id = ?)
+        """, (guild_id, user_id)).fetchone()
+        exists = conn.execute("SELECT 1 FROM usuarios WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if exists else None
+
+# --- Cache da Configuração ---
+# Carregado uma vez no init_db e mantido em dia pelo update_config (write-through),
+# então ler a configuração no caminho das apostas é só um acesso a dicionário.
+_config = {}
+
+def _parse_config(config_key: str, config_value):
+    return CONFIG_TIPOS.get(config_key, str)(config_value)
 
 def get_config(config_key: str):
-    """Busca um valor da tabela de configuração do bot."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT config_value FROM bot_config WHERE config_key = ?", (config_key,))
-    data = cursor.fetchone()
-    conn.close()
-    return data[0] if data else None
-
-def update_config(config_key: str, config_value: str):
-    """Atualiza um valor na tabela de configuração do bot."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE bot_config SET config_value = ? WHERE config_key = ?", (config_value, config_key))
-    conn.commit()
-    conn.close()
+    """Busca um valor da configuração do bot (em memória, já convertido para int/float)."""
+    return _config.get(config_key)
+
+async def update_config(config_key: str, config_value):
+    """Atualiza um valor da configuração do bot (no cache e na tabela)."""
+    _config[config_key] = _parse_config(config_key, config_value)
+    await _update_config(config_key, str(config_value))
+
+@writer_task
+def _load_config():
+    with write_conn() as conn:
+        rows = conn.execute("SELECT config_key, config_value FROM bot_config").fetchall()
+    return {key: _parse_config(key, value) for key, value in rows}
+
+@writer_task
+def _update_config(config_key: str, config_value: str):
+    with write_conn() as conn:
+        conn.execute("UPDATE bot_config SET config_value = ? WHERE config_key = ?", (config_value, config_key))
+        conn.commit()
+
+@writer_task
+def _insert_logs(rows):
+    """Insere um lote de logs em uma única transação (um único commit/fsync)."""
+    with write_conn() as conn:
+        conn.executemany("INSERT INTO logs (user_id, action, details, timestamp) VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+
+class LogWriter:
+    """Buffer de escrita dos logs: agrupa os inserts em lotes de N linhas ou T milissegundos."""
+    def __init__(self, batch_size=LOG_BATCH_SIZE, flush_ms=LOG_FLUSH_MS, max_pending=LOG_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self.queue = None
+        self.task = None
+        self.batch_ready = None
+
+    def _ensure_started(self):
+        if self.task is None or self.task.done():
+            if self.queue is None:
+                self.queue = asyncio.Queue(maxsize=self.max_pending)
+                self.batch_ready = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+
+    async def put(self, row):
+        """Enfileira um log. Se a fila estiver cheia, espera o escritor abrir espaço."""
+        self._ensure_started()
+        await self.queue.put(row)
+        if self.queue.qsize() >= self.batch_size:
+            self.batch_ready.set()
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            if self.queue.qsize() < self.batch_size - 1:
+                try:
+                    await asyncio.wait_for(self.batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self.batch_ready.clear()
+
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                await _insert_logs(batch)
+            except Exception as e:
+                print(f"Erro ao gravar lote de {len(batch)} logs: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def flush(self):
+        """Grava imediatamente tudo que está no buffer e espera terminar."""
+        if self.queue is None or self.task is None or self.task.done():
+            return
+        self.batch_ready.set()
+        await self.queue.join()
+
+    async def stop(self):
+        """Esvazia o buffer e encerra a task de escrita."""
+        await self.flush()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+_log_writer = LogWriter()
 
 async def db_log(user_id: int, action: str, details: str):
-    """Insere um registro na tabela de logs do DB."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO logs (user_id, action, details) VALUES (?, ?, ?)", (user_id, action, details))
-    conn.commit()
-    conn.close()
+    """Insere um registro na tabela de logs do DB (gravado em lote pelo LogWriter)."""
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    await _log_writer.put((user_id, action, details, timestamp))
+
+async def flush_logs():
+    """Força a gravação dos logs pendentes no buffer."""
+    await _log_writer.flush()
 
 async def get_db_logs(limit: int = 15):
-    """Busca os últimos N logs do banco de dados."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT timestamp, user_id, action, details FROM logs ORDER BY timestamp DESC LIMIT ?", (limit,))
-    logs = cursor.fetchall()
-    conn.close()
-    return logs
+    """Busca os últimos N logs do banco de dados (após gravar os pendentes)."""
+    await flush_logs()
+    return await _get_db_logs(limit)
+
+@reader_task
+def _get_db_logs(limit: int = 15):
+    """Consulta os últimos N logs no pool de leitura."""
+    with read_conn() as conn:
+        return conn.execute("SELECT timestamp, user_id, action, details FROM logs ORDER BY log_id DESC LIMIT ?", (limit,)).fetchall()
+
+# --- Acumulador do Jackpot ---
+class JackpotAccumulator:
+    """Jackpot em memória: contribuições são somas atômicas e o valor vai para o SQLite periodicamente."""
+    def __init__(self, inicial=JACKPOT_INICIAL):
+        self.inicial = inicial
+        self.valor = inicial
+        self.gravado = inicial
+        self._lock = threading.Lock()
+
+    def carregar(self, valor: int):
+        with self._lock:
+            self.valor = self.gravado = valor
+
+    def contribuir(self, valor: int) -> int:
+        with self._lock:
+            self.valor += valor
+            return self.valor
+
+    def resgatar(self) -> int:
+        """Compare-and-reset: devolve o prêmio atual e zera o pote no mesmo passo (só um ganhador leva)."""
+        with self._lock:
+            premio = self.valor
+            self.valor = self.inicial
+            return premio
+
+    def devolver(self, premio: int):
+        """Devolve ao pote um prêmio que não pôde ser pago."""
+        with self._lock:
+            self.valor += premio - self.inicial
+
+_jackpot = JackpotAccumulator()
+
+def get_jackpot() -> int:
+    """Valor atual do jackpot (em memória)."""
+    return _jackpot.valor
+
+def contribuir_jackpot(valor: int) -> int:
+    """Soma uma contribuição ao jackpot e retorna o novo valor."""
+    return _jackpot.contribuir(valor)
+
+def resgatar_jackpot() -> int:
+    """Retira o jackpot inteiro para um ganhador (o pote volta ao valor inicial)."""
+    return _jackpot.resgatar()
+
+async def flush_jackpot():
+    """Grava o jackpot no banco se ele mudou desde a última gravação."""
+    valor = _jackpot.valor
+    if valor != _jackpot.gravado:
+        await _update_config('jackpot', str(valor))
+        _jackpot.gravado = valor
+
+async def settle_jackpot(user_id: int, aposta: int, premio: int):
+    """Paga um jackpot já resgatado (o prêmio vem por cima da aposta) e grava o pote na mesma transação.
+    Se a carteira não cobrir mais a aposta, o prêmio volta para o pote e retorna None."""
+    valor = _jackpot.valor
+    balance = await _settle_jackpot(user_id, aposta, premio, valor)
+    if balance is None:
+        _jackpot.devolver(premio)
+    else:
+        _jackpot.gravado = valor
+    return balance
+
+@writer_task
+def _settle_jackpot(user_id: int, aposta: int, premio: int, novo_jackpot: int):
+    with write_conn() as conn:
+        rows = conn.execute(
+            "UPDATE usuarios SET carteira = carteira + ? WHERE user_id = ? AND carteira >= ? RETURNING carteira, banco",
+            (premio, user_id, aposta)
+        ).fetchall()
+        if not rows:
+            conn.rollback()
+            return None
+        conn.execute("UPDATE stats SET vitorias = vitorias + 1 WHERE user_id = ?", (user_id,))
+        conn.execute("UPDATE bot_config SET config_value = ? WHERE config_key = 'jackpot'", (str(novo_jackpot),))
+        conn.commit()
+    return _balance_changed(user_id, rows)
 
 async def reset_economy():
     """Reseta as tabelas usuarios e stats e os configs do bot."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM usuarios")
-    cursor.execute("DELETE FROM stats")
-    conn.commit()
-    conn.close()
-
-    # Reseta configs para o padrão
-    update_config('jackpot', '100000')
-    update_config('max_aposta', '50000')
+    # Garante que os logs das apostas anteriores ao reset fiquem gravados
+    await flush_logs()
+    await _reset_economy()
+    _config['max_aposta'] = _parse_config('max_aposta', CONFIG_PADRAO['max_aposta'])
+    _jackpot.carregar(JACKPOT_INICIAL)
+
+@writer_task
+def _reset_economy():
+    with write_conn() as conn:
+        conn.execute("DELETE FROM usuarios")
+        conn.execute("DELETE FROM stats")
+        # Reseta configs para o padrão
+        conn.executemany(
+            "UPDATE bot_config SET config_value = ? WHERE config_key = ?",
+            [(CONFIG_PADRAO['jackpot'], 'jackpot'), (CONFIG_PADRAO['max_aposta'], 'max_aposta')]
+        )
+        conn.commit()
+        _ranking.limpar()
+
+async def close_connections():
+    """Grava os logs pendentes e o jackpot, fecha as conexões na thread de escrita e encerra os executores do DB."""
+    await _log_writer.stop()
+    await flush_jackpot()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_writer, _close_connections)
+    _writer.shutdown(wait=False)
+    _readers.shutdown(wait=False)
 
 print("[database.py] Funções de banco de dados prontas.")
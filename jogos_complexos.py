@@ -5,110 +5,171 @@ import random
 import math
 import asyncio
 import datetime
+import time
+import heapq
+import weakref
+from array import array
+from collections import Counter
 
 # Importa nossas funções do DB
 import database
-
-# --- Constantes (copiadas do main.py) ---
-NAIPES = ['❤️', '♦️', '♣️', '♠️']
-VALORES_CARTAS = {
-    'A': 11, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'J': 10, 'Q': 10, 'K': 10
-}
+from log_dispatcher import PRIORIDADE_BAIXA
+from constantes import (
+    NAIPES, VALORES_CARTAS, BLACKJACK_PAGAMENTO, BLACKJACK_PAGAMENTO_NATURAL, DEALER_PARA_EM,
+    CRASH_CRESCIMENTO, CRASH_FATOR, CRASH_EXP_MINIMO, CRASH_MINIMO
+)
+
+# --- Constantes ---
+# Cartas são ints 0-51: valor = c % 13 (na ordem de VALORES_CARTAS), naipe = c // 13.
+# As tabelas abaixo são montadas uma vez; pontuar e exibir uma carta vira só um acesso por índice.
+_NOMES_VALORES = list(VALORES_CARTAS)
+PONTOS_CARTA = bytes(VALORES_CARTAS[_NOMES_VALORES[c % 13]] for c in range(52))
+TEXTO_CARTA = tuple(f"`{_NOMES_VALORES[c % 13]}{NAIPES[c // 13]}`" for c in range(52))
+BARALHO_ORDENADO = array('B', range(52))
+BLACKJACK_BARALHOS = 6       # Baralhos no sapato de cada servidor
+BLACKJACK_PENETRACAO = 0.75  # Fração do sapato distribuída antes da carta de corte (reembaralha ao chegar nela)
+MESA_ASSENTOS = 7            # Jogadores por mesa de Blackjack
+MESA_ESPERA = 15             # Segundos para sentar antes das cartas serem distribuídas
+MESA_RENDER_INTERVALO = 1.0  # Mínimo de segundos entre edições da mensagem da mesa
+DUELO_EXPIRA = 60            # Segundos para o desafiado aceitar um duelo
+BLACKJACK_TTL = 120          # Segundos sem -hit/-stand até o jogo ser encerrado automaticamente
+CRASH_ESPERA = 10            # Segundos para os jogadores entrarem antes da rodada começar
+CRASH_RENDER_INTERVALO = 1.0 # Segundos entre edições da mensagem do Crash (limite de edição do Discord)
+CRASH_ALVO_MINIMO = 1.01     # Limites do saque automático (-crash <valor> <alvo>)
+CRASH_ALVO_MAXIMO = 1000.0
+CRASH_TOLERANCIA_SAQUE = 1.0 # Segundos após o crash em que ainda chegam saques pedidos antes dele
+
+
+def gerar_crash_point():
+    """Sorteia o ponto em que o foguete explode (definido antes da rodada começar)."""
+    return CRASH_FATOR / max(CRASH_EXP_MINIMO, random.expovariate(1.0)) + CRASH_MINIMO
 
 
 # --- 5. Classes de Lógica de Jogo (Blackjack, Crash, Duelo) ---
 
-class Card:
-    """Representa uma única carta de baralho."""
-    def __init__(self, naipe, valor):
-        self.naipe = naipe
-        self.valor = valor # 'A', 'K', 'Q', 'J', '10', ...
-
-    def __str__(self):
-        return f"`{self.valor}{self.naipe}`"
-
-class Deck:
-    """Representa um baralho de 52 cartas."""
-    def __init__(self):
-        self.cartas = []
-        self.build()
+class Shoe:
+    """Sapato com vários baralhos, compartilhado pelos jogos de um servidor.
+    Só é embaralhado quando uma mão nova começa depois da carta de corte; dar uma carta só avança um índice.
+    As cartas que ainda estão nas mãos de jogos em andamento (de qualquer jogo ou mesa do servidor) ficam fora do
+    reembaralhamento, então nenhuma carta aparece duas vezes ao mesmo tempo."""
+    __slots__ = ('cartas', 'pos', 'corte', 'embaralhadas', 'completo', 'penetracao', 'em_jogo')
+
+    def __init__(self, baralhos=BLACKJACK_BARALHOS, penetracao=BLACKJACK_PENETRACAO):
+        self.completo = Counter(BARALHO_ORDENADO * baralhos)
+        self.penetracao = penetracao
+        self.em_jogo = weakref.WeakSet() # Mãos ainda na mesa; um jogo esquecido sai sozinho quando é coletado
+        self.embaralhadas = 0
         self.shuffle()
 
-    def build(self):
-        for naipe in NAIPES:
-            for valor in VALORES_CARTAS:
-                self.cartas.append(Card(naipe, valor))
-
     def shuffle(self):
+        em_mao = Counter(carta for mao in self.em_jogo for carta in mao.cartas)
+        self.cartas = array('B', (self.completo - em_mao).elements())
         random.shuffle(self.cartas)
+        self.corte = int(len(self.cartas) * self.penetracao)
+        self.pos = 0
+        self.embaralhadas += 1
+
+    def nova_mao(self, *maos):
+        """Chamado antes de distribuir uma mão nova: reembaralha se a carta de corte já saiu e passa a contar `maos` como em jogo."""
+        if self.pos >= self.corte:
+            self.shuffle()
+        self.em_jogo.update(maos)
+
+    def descartar(self, *maos):
+        """O jogo terminou: as cartas dessas mãos voltam para o próximo embaralhamento."""
+        for mao in maos:
+            self.em_jogo.discard(mao)
 
     def deal(self):
-        if len(self.cartas) > 0:
-            return self.cartas.pop()
-        return None # Fim do baralho
+        if self.pos == len(self.cartas):
+            self.shuffle() # Muitas mãos abertas depois do corte esgotaram o sapato
+        carta = self.cartas[self.pos]
+        self.pos += 1
+        return carta
+
+class Hand:
+    """Mão de Blackjack com o total e os ases "macios" (valendo 11) mantidos a cada carta recebida."""
+    __slots__ = ('cartas', 'total', 'ases_macios', '__weakref__')
+
+    def __init__(self):
+        self.cartas = array('B')
+        self.total = 0
+        self.ases_macios = 0
+
+    def add(self, carta):
+        pontos = PONTOS_CARTA[carta]
+        self.cartas.append(carta)
+        self.total += pontos
+        if pontos == 11:
+            self.ases_macios += 1
+        while self.total > 21 and self.ases_macios:
+            self.total -= 10
+            self.ases_macios -= 1
+
+    @property
+    def blackjack(self):
+        return self.total == 21 and len(self.cartas) == 2
+
+    def __len__(self):
+        return len(self.cartas)
+
+    def to_string(self, hide_first=False):
+        if hide_first:
+            return f"{TEXTO_CARTA[self.cartas[0]]} `?`"
+        return " ".join(TEXTO_CARTA[carta] for carta in self.cartas)
 
 class BlackjackGame:
     """Guarda o estado de um jogo de Blackjack."""
-    def __init__(self, bot, ctx, bet):
+    def __init__(self, bot, ctx, bet, shoe):
         self.bot = bot
         self.ctx = ctx
         self.bet = bet
-        self.deck = Deck()
-        self.player_hand = []
-        self.dealer_hand = []
+        self.shoe = shoe
+        self.player_hand = Hand()
+        self.dealer_hand = Hand()
         self.game_over = False
         self.message = None # A mensagem que será editada
-
-    def calculate_score(self, hand):
-        score = 0
-        aces = 0
-        for card in hand:
-            score += VALORES_CARTAS[card.valor]
-            if card.valor == 'A':
-                aces += 1
-        while score > 21 and aces > 0:
-            score -= 10
-            aces -= 1
-        return score
-
-    def hand_to_string(self, hand, hide_first=False):
-        if hide_first:
-            return f"{hand[0]} `?`"
-        return " ".join(str(card) for card in hand)
+        self.ultima_acao = time.monotonic()
 
     async def start_game(self):
         """Inicia o jogo, distribui cartas e envia a primeira mensagem."""
-        balance = database.get_balance(self.ctx.author.id)
-        database.update_balance(self.ctx.author.id, balance['carteira'] - self.bet, balance['banco'])
+        if await database.add_balance(self.ctx.author.id, carteira_delta=-self.bet) is None:
+            del self.bot.active_blackjack_games[self.ctx.author.id]
+            await self.ctx.send("Você não tem mais todo esse dinheiro na carteira para apostar.")
+            return
 
-        self.player_hand.append(self.deck.deal())
-        self.dealer_hand.append(self.deck.deal())
-        self.player_hand.append(self.deck.deal())
-        self.dealer_hand.append(self.deck.deal())
+        self.shoe.nova_mao(self.player_hand, self.dealer_hand)
+        self.player_hand.add(self.shoe.deal())
+        self.dealer_hand.add(self.shoe.deal())
+        self.player_hand.add(self.shoe.deal())
+        self.dealer_hand.add(self.shoe.deal())
+        self.bot.blackjack_reaper.registrar(self.ctx.author.id, self)
+        self.bot.journal.abrir(
+            f"bj:{self.ctx.author.id}", self.ctx.author.id, self.bet, jogo="blackjack",
+            mao=self.player_hand.cartas.tolist(), dealer=self.dealer_hand.cartas.tolist(), shoe=self.shoe.pos
+        )
 
         self.message = await self.ctx.send(embed=self.create_embed("Use `-hit` ou `-stand`"))
 
-        player_score = self.calculate_score(self.player_hand)
-        if player_score == 21:
+        if self.player_hand.total == 21:
             await self.end_game(True, "Blackjack! Você ganhou 1.5x a aposta!")
 
     def create_embed(self, footer_text):
-        player_score = self.calculate_score(self.player_hand)
-        dealer_score = self.calculate_score(self.dealer_hand)
-
         embed = discord.Embed(title=f"Blackjack (21) - Aposta: $ {self.bet:,}", color=discord.Color.dark_green())
-        embed.set_author(name=self.ctx.author.display_name, icon_url=self.ctx.author.avatar.url if self.ctx.author.avatar else discord.Embed.Empty)
+        embed.set_author(name=self.ctx.author.display_name, icon_url=self.ctx.author.avatar.url if self.ctx.author.avatar else None)
 
-        embed.add_field(name=f"Sua Mão ({player_score})", value=self.hand_to_string(self.player_hand), inline=False)
-        embed.add_field(name=f"Mão do Dealer ({'?' if not self.game_over else dealer_score})", value=self.hand_to_string(self.dealer_hand, hide_first=not self.game_over), inline=False)
+        embed.add_field(name=f"Sua Mão ({self.player_hand.total})", value=self.player_hand.to_string(), inline=False)
+        embed.add_field(name=f"Mão do Dealer ({'?' if not self.game_over else self.dealer_hand.total})", value=self.dealer_hand.to_string(hide_first=not self.game_over), inline=False)
         embed.set_footer(text=footer_text)
         return embed
 
     async def player_hit(self):
         if self.game_over: return
+        self.ultima_acao = time.monotonic()
 
-        self.player_hand.append(self.deck.deal())
-        player_score = self.calculate_score(self.player_hand)
+        self.player_hand.add(self.shoe.deal())
+        self.bot.journal.atualizar(f"bj:{self.ctx.author.id}", mao=self.player_hand.cartas.tolist(), shoe=self.shoe.pos)
+        player_score = self.player_hand.total
 
         if player_score > 21:
             await self.end_game(False, "Estourou! Você perdeu.")
@@ -121,15 +182,15 @@ class BlackjackGame:
         if self.game_over: return
         self.game_over = True
 
-        player_score = self.calculate_score(self.player_hand)
-        dealer_score = self.calculate_score(self.dealer_hand)
+        player_score = self.player_hand.total
+        dealer_score = self.dealer_hand.total
 
         await self.message.edit(embed=self.create_embed("Dealer está jogando..."))
         await asyncio.sleep(1.5)
 
-        while dealer_score < 17:
-            self.dealer_hand.append(self.deck.deal())
-            dealer_score = self.calculate_score(self.dealer_hand)
+        while dealer_score < DEALER_PARA_EM:
+            self.dealer_hand.add(self.shoe.deal())
+            dealer_score = self.dealer_hand.total
             await self.message.edit(embed=self.create_embed("Dealer está jogando..."))
             await asyncio.sleep(1)
 
@@ -145,20 +206,20 @@ class BlackjackGame:
     async def end_game(self, won, message="", is_push=False):
         self.game_over = True
         author_id = self.ctx.author.id
+        self.shoe.descartar(self.player_hand, self.dealer_hand)
 
-        taxa = float(database.get_config('taxa_casa'))
-        balance = database.get_balance(author_id)
+        taxa = database.get_config('taxa_casa')
 
+        ganhos = 0
         log_msg = ""
         log_color = discord.Color.red()
 
         if won:
-            player_score = self.calculate_score(self.player_hand)
-            if player_score == 21 and len(self.player_hand) == 2:
-                multiplicador = 2.5
+            if self.player_hand.blackjack:
+                multiplicador = BLACKJACK_PAGAMENTO_NATURAL
                 message = "Blackjack! Você ganhou 1.5x a aposta!"
             else:
-                multiplicador = 2.0
+                multiplicador = BLACKJACK_PAGAMENTO
 
             if self.bot.happy_hour:
                 multiplicador *= self.bot.happy_hour_multiplier
@@ -167,43 +228,369 @@ class BlackjackGame:
             multiplicador_real = multiplicador * (1 - taxa)
             ganhos = math.floor(self.bet * multiplicador_real)
             lucro = ganhos - self.bet
-            nova_carteira = balance['carteira'] + ganhos
-
-            await database.update_stats(author_id, vitorias_add=1)
+            await database.settle_bet(author_id, 0, ganhos, vitorias_add=1)
+            self.bot.journal.fechar(f"bj:{author_id}")
             log_msg = f"**Blackjack (Vitória)**: {self.ctx.author.mention} apostou `$ {self.bet:,}` e lucrou `$ {lucro:,}`."
             log_color = discord.Color.green()
 
         elif is_push:
-            nova_carteira = balance['carteira'] + self.bet
+            await database.settle_bet(author_id, 0, self.bet)
+            self.bot.journal.fechar(f"bj:{author_id}")
             log_msg = f"**Blackjack (Empate)**: {self.ctx.author.mention} apostou `$ {self.bet:,}` e recebeu a aposta de volta."
             log_color = discord.Color.greyple()
 
         else:
-            nova_carteira = balance['carteira']
             await database.update_stats(author_id, derrotas_add=1)
+            self.bot.journal.fechar(f"bj:{author_id}")
             log_msg = f"**Blackjack (Derrota)**: {self.ctx.author.mention} apostou e perdeu `$ {self.bet:,}`."
 
-        database.update_balance(author_id, nova_carteira, balance['banco'])
-
         await self.message.edit(embed=self.create_embed(f"FIM DE JOGO: {message}"))
-        await self.bot.log_action(log_msg, log_color)
+        await self.bot.log_action(log_msg, log_color, PRIORIDADE_BAIXA)
         await database.db_log(author_id, "BLACKJACK", f"Aposta: {self.bet}, Resultado: {message}")
 
         del self.bot.active_blackjack_games[author_id]
 
-class CrashGame:
-    """Guarda o estado de um jogo de Crash (para todos)."""
+class Assento:
+    """Lugar de um jogador em uma mesa de Blackjack. Fica em active_blackjack_games, então -hit e -stand funcionam igual."""
+    __slots__ = ('mesa', 'user', 'bet', 'mao', 'status', 'ultima_acao')
+
+    def __init__(self, mesa, user, bet):
+        self.mesa = mesa
+        self.user = user
+        self.bet = bet
+        self.mao = Hand()
+        self.status = "jogando" # jogando, parou, estourou, blackjack
+        self.ultima_acao = time.monotonic()
+
+    @property
+    def game_over(self):
+        return self.status != "jogando"
+
+    @property
+    def message(self):
+        return self.mesa.message
+
+    async def player_hit(self):
+        self.ultima_acao = time.monotonic()
+        await self.mesa.hit(self)
+
+    async def player_stand(self):
+        await self.mesa.stand(self)
+
+class BlackjackTable:
+    """Mesa de Blackjack com vários jogadores contra uma única mão do dealer e uma única mensagem."""
+    def __init__(self, bot, channel, chave, shoe):
+        self.bot = bot
+        self.channel = channel
+        self.chave = chave
+        self.shoe = shoe
+        self.assentos = {} # user_id -> Assento, na ordem de entrada
+        self.dealer_hand = Hand()
+        self.stage = "waiting" # waiting, playing, done
+        self.message = None
+        self.resultado = {} # user_id -> texto do resultado final
+        self.sujo = False # Existe alteração ainda não mostrada na mensagem
+        self.render_task = None
+        self.abrindo = False
+        self.inicio_timer = None
+
+    async def add_player(self, ctx, bet):
+        if self.stage != "waiting" or len(self.assentos) >= MESA_ASSENTOS:
+            await ctx.send("Essa mesa já começou ou está cheia. Espere a próxima!")
+            return False
+
+        if await database.add_balance(ctx.author.id, carteira_delta=-bet) is None:
+            await ctx.send("Você não tem mais todo esse dinheiro na carteira para apostar.")
+            return False
+
+        if self.stage != "waiting" or len(self.assentos) >= MESA_ASSENTOS or ctx.author.id in self.bot.active_blackjack_games:
+            # A mesa fechou enquanto a aposta era debitada: devolve
+            await database.add_balance(ctx.author.id, carteira_delta=bet)
+            await ctx.send("Essa mesa já começou ou está cheia. Espere a próxima!")
+            return False
+
+        assento = Assento(self, ctx.author, bet)
+        self.assentos[ctx.author.id] = assento
+        self.bot.active_blackjack_games[ctx.author.id] = assento
+        self.bot.journal.abrir(f"bj:{ctx.author.id}", ctx.author.id, bet, jogo="mesa", canal=self.chave)
+
+        if not self.abrindo:
+            self.abrindo = True
+            if not await self._abrir():
+                return False
+        else:
+            self.atualizar()
+        if len(self.assentos) >= MESA_ASSENTOS:
+            if self.inicio_timer:
+                self.inicio_timer.cancelar()
+            await self.iniciar()
+        return True
+
+    async def _abrir(self):
+        """Envia a mensagem da mesa e agenda a distribuição das cartas para quando o tempo de espera acabar.
+        Se a mensagem não puder ser enviada, a mesa é cancelada e as apostas devolvidas."""
+        try:
+            self.message = await self.channel.send(embed=self.create_embed())
+        except discord.HTTPException as e:
+            print(f"Erro ao abrir a mesa de Blackjack: {e}")
+            await self._cancelar()
+            return False
+        if self.sujo:
+            self.atualizar()
+        if self.stage == "waiting":
+            self.inicio_timer = self.bot.timers.agendar(MESA_ESPERA, self.iniciar)
+        return True
+
+    async def _cancelar(self):
+        """Fecha a mesa sem jogar e devolve a aposta de todos os assentos (inclusive de quem sentou durante o envio)."""
+        self.stage = "done"
+        if self.inicio_timer:
+            self.inicio_timer.cancelar()
+        self.shoe.descartar(self.dealer_hand, *(assento.mao for assento in self.assentos.values()))
+        for user_id in self.assentos:
+            self.bot.active_blackjack_games.pop(user_id, None)
+        if self.bot.mesas_blackjack.get(self.chave) is self:
+            del self.bot.mesas_blackjack[self.chave]
+        resultados = [(user_id, assento.bet, 0, 0) for user_id, assento in self.assentos.items()]
+        await database.settle_results(resultados, "BLACKJACK_MESA_CANCELADA", "Assentos: " + ", ".join(f"{uid}:{bet}" for uid, bet, _, _ in resultados))
+        for user_id in self.assentos:
+            self.bot.journal.fechar(f"bj:{user_id}")
+
+    async def iniciar(self):
+        if self.stage != "waiting": return
+        self.stage = "playing"
+
+        self.shoe.nova_mao(self.dealer_hand, *(assento.mao for assento in self.assentos.values()))
+        for _ in range(2):
+            for assento in self.assentos.values():
+                assento.mao.add(self.shoe.deal())
+            self.dealer_hand.add(self.shoe.deal())
+
+        for user_id, assento in self.assentos.items():
+            if assento.mao.blackjack:
+                assento.status = "blackjack"
+            else:
+                self.bot.blackjack_reaper.registrar(user_id, assento)
+
+        if self._todos_terminaram():
+            await self.vez_do_dealer()
+        else:
+            self.atualizar()
+
+    def _todos_terminaram(self):
+        return all(assento.status != "jogando" for assento in self.assentos.values())
+
+    async def hit(self, assento):
+        if self.stage != "playing" or assento.status != "jogando": return
+        assento.mao.add(self.shoe.deal())
+        if assento.mao.total > 21:
+            assento.status = "estourou"
+        elif assento.mao.total == 21:
+            assento.status = "parou"
+        await self._depois_da_jogada()
+
+    async def stand(self, assento):
+        if self.stage != "playing" or assento.status != "jogando": return
+        assento.status = "parou"
+        await self._depois_da_jogada()
+
+    async def _depois_da_jogada(self):
+        if self._todos_terminaram():
+            await self.vez_do_dealer()
+        else:
+            self.atualizar()
+
+    def atualizar(self):
+        """Marca a mesa para ser redesenhada. Várias jogadas seguidas viram uma só edição da mensagem."""
+        self.sujo = True
+        if self.render_task is None or self.render_task.done():
+            self.render_task = asyncio.create_task(self._render_loop())
+
+    async def _render_loop(self):
+        while self.sujo and self.message is not None:
+            self.sujo = False
+            try:
+                await self.message.edit(embed=self.create_embed())
+            except discord.HTTPException as e:
+                print(f"Erro ao renderizar a mesa de Blackjack: {e}")
+            await asyncio.sleep(MESA_RENDER_INTERVALO)
+
+    def create_embed(self):
+        if self.stage == "waiting":
+            desc = f"Mesa aberta! Digite `-mesa <valor>` para sentar (até {MESA_ASSENTOS} jogadores). Começa em **{MESA_ESPERA} segundos**."
+            color = discord.Color.greyple()
+        elif self.stage == "playing":
+            desc = "Use `-hit` ou `-stand`. O dealer joga quando todos terminarem."
+            color = discord.Color.dark_green()
+        else:
+            desc = "FIM DE JOGO!"
+            color = discord.Color.dark_green()
+
+        embed = discord.Embed(title=f"🃏 Mesa de Blackjack ({len(self.assentos)}/{MESA_ASSENTOS})", description=desc, color=color)
+        if self.stage != "waiting":
+            revelar = self.stage == "done"
+            embed.add_field(
+                name=f"Dealer ({self.dealer_hand.total if revelar else '?'})",
+                value=self.dealer_hand.to_string(hide_first=not revelar), inline=False
+            )
+        for user_id, assento in self.assentos.items():
+            if self.stage == "waiting":
+                embed.add_field(name=assento.user.display_name, value=f"$ {assento.bet:,}", inline=True)
+                continue
+            status = self.resultado.get(user_id, assento.status.capitalize())
+            embed.add_field(
+                name=f"{assento.user.display_name} ({assento.mao.total}) - $ {assento.bet:,}",
+                value=f"{assento.mao.to_string()}\n{status}", inline=True
+            )
+        return embed
+
+    async def vez_do_dealer(self):
+        """Uma única vez para a mesa toda: o dealer compra até 17 (se alguém ainda estiver no jogo) e todos são liquidados juntos."""
+        if self.stage != "playing": return
+        self.stage = "done"
+
+        if any(assento.status == "parou" for assento in self.assentos.values()):
+            while self.dealer_hand.total < DEALER_PARA_EM:
+                self.dealer_hand.add(self.shoe.deal())
+        dealer_score = self.dealer_hand.total
+        self.shoe.descartar(self.dealer_hand, *(assento.mao for assento in self.assentos.values()))
+
+        taxa = database.get_config('taxa_casa')
+        bonus = self.bot.happy_hour_multiplier if self.bot.happy_hour else 1
+        resultados = []
+        total_lucro = 0
+        for user_id, assento in self.assentos.items():
+            player_score = assento.mao.total
+            if assento.status == "estourou":
+                resultado, multiplicador = "Estourou!", 0
+            elif assento.status == "blackjack" and not self.dealer_hand.blackjack:
+                resultado, multiplicador = "Blackjack!", BLACKJACK_PAGAMENTO_NATURAL
+            elif dealer_score > 21 or player_score > dealer_score:
+                resultado, multiplicador = "Ganhou!", BLACKJACK_PAGAMENTO
+            elif player_score == dealer_score:
+                resultado, multiplicador = "Empate (aposta devolvida)", None
+            else:
+                resultado, multiplicador = "Perdeu.", 0
+
+            if multiplicador is None:
+                resultados.append((user_id, assento.bet, 0, 0))
+            elif multiplicador:
+                ganhos = math.floor(assento.bet * multiplicador * bonus * (1 - taxa))
+                resultados.append((user_id, ganhos, 1, 0))
+                total_lucro += ganhos - assento.bet
+            else:
+                resultados.append((user_id, 0, 0, 1))
+                total_lucro -= assento.bet
+            self.resultado[user_id] = resultado
+            self.bot.active_blackjack_games.pop(user_id, None)
+
+        if self.bot.mesas_blackjack.get(self.chave) is self:
+            del self.bot.mesas_blackjack[self.chave]
+
+        detalhes = f"Dealer: {dealer_score}, Assentos: " + ", ".join(
+            f"{uid}:{assento.bet}:{self.resultado[uid]}" for uid, assento in self.assentos.items()
+        )
+        await database.settle_results(resultados, "BLACKJACK_MESA", detalhes)
+        for user_id in self.assentos:
+            self.bot.journal.fechar(f"bj:{user_id}")
+
+        self.atualizar()
+        log_msg = f"**Blackjack (Mesa)**: {len(self.assentos)} jogador(es), resultado da casa `$ {-total_lucro:,}`."
+        if self.bot.happy_hour:
+            log_msg += " (HH)"
+        await self.bot.log_action(log_msg, discord.Color.dark_green(), PRIORIDADE_BAIXA)
+
+class BlackjackReaper:
+    """Encerra jogos de Blackjack parados. Cada jogo tem um prazo no TimerService do bot;
+    jogadas só atualizam `ultima_acao` e o prazo é renovado quando vence."""
     def __init__(self, bot):
         self.bot = bot
+        self.auto_stand = 0
+        self.reembolsados = 0
+
+    def registrar(self, user_id, game):
+        game.ultima_acao = time.monotonic()
+        self.bot.timers.agendar_em(game.ultima_acao + BLACKJACK_TTL, self._vencer, user_id, game)
+
+    def stats(self):
+        return {'vivos': len(self.bot.active_blackjack_games), 'auto_stand': self.auto_stand, 'reembolsados': self.reembolsados}
+
+    def _vencer(self, user_id, game):
+        if self.bot.active_blackjack_games.get(user_id) is not game or game.game_over:
+            return # Já terminou (ou o assento está só esperando o resto da mesa)
+        prazo = game.ultima_acao + BLACKJACK_TTL
+        if prazo > time.monotonic():
+            self.bot.timers.agendar_em(prazo, self._vencer, user_id, game)
+            return
+        self.bot.timers.criar_task(self._encerrar(user_id, game))
+
+    async def _encerrar(self, user_id, game):
+        """Para o jogo pelo jogador; se a mensagem nunca chegou a ser enviada, devolve a aposta."""
+        try:
+            if game.message is None:
+                del self.bot.active_blackjack_games[user_id]
+                await database.add_balance(user_id, carteira_delta=game.bet)
+                self.bot.journal.fechar(f"bj:{user_id}")
+                await database.db_log(user_id, "BLACKJACK_REEMBOLSO", f"Aposta: {game.bet} (jogo parado)")
+                self.reembolsados += 1
+            else:
+                await game.player_stand()
+                self.auto_stand += 1
+        except Exception as e:
+            print(f"Erro ao encerrar jogo de Blackjack parado: {e}")
+            # Não dá para saber se a aposta já foi liquidada: só libera o jogador
+            if self.bot.active_blackjack_games.get(user_id) is game:
+                del self.bot.active_blackjack_games[user_id]
+
+class CrashGame:
+    """Guarda o estado de uma rodada de Crash (uma por servidor)."""
+    def __init__(self, bot, manager, chave):
+        self.bot = bot
+        self.manager = manager
+        self.chave = chave # guild_id (ou channel_id em DMs)
         self.players = {}
         self.cashed_out = {}
-        self.multiplier = 1.00
-        self.game_task = None
+        self.nomes = {} # Nomes guardados na entrada, para não chamar get_user a cada renderização
+        self.alvos = [] # Heap de (alvo, user_id) dos saques automáticos, o menor alvo no topo
+        self.alvo_de = {} # user_id -> alvo, só para exibição
+        self.crash_point = gerar_crash_point()
+        self.inicio = None # time.monotonic() do início da rodada
+        self.fim = None    # Momento exato (monotonic) em que o multiplicador chega ao crash_point
         self.message = None
+        self.renderizando = False # Já existe uma edição da mensagem em andamento
         self.lock = asyncio.Lock()
         self.stage = "waiting"
-
-    async def add_player(self, ctx, bet):
+        self.liquidado = False # Os perdedores já foram separados: nenhum saque entra depois disso
+        self.abrindo = False # Alguém já entrou e a mensagem/espera da rodada já foi (ou está sendo) aberta
+        self.rodada_id = f"{chave}:{time.time_ns()}" # Identifica a rodada no diário de jogos abertos
+
+    def multiplicador_em(self, instante):
+        """Multiplicador em um instante (time.monotonic()), truncado em 2 casas e limitado ao crash_point."""
+        if self.inicio is None:
+            return 1.00
+        multi = math.exp(CRASH_CRESCIMENTO * max(0.0, instante - self.inicio))
+        return min(math.floor(multi * 100) / 100, self.crash_point)
+
+    def instante_do_alvo(self, alvo):
+        """Momento (monotonic) em que o multiplicador alcança `alvo`."""
+        return self.inicio + math.log(alvo) / CRASH_CRESCIMENTO
+
+    def _proximo_alvo(self):
+        """Descarta alvos de quem já saiu e devolve o instante do próximo saque automático, ou None.
+        Alvos iguais ou acima do crash_point nunca são alcançados. Chamar com o lock."""
+        while self.alvos and self.alvos[0][1] not in self.players:
+            heapq.heappop(self.alvos)
+        if self.alvos and self.alvos[0][0] < self.crash_point:
+            return self.instante_do_alvo(self.alvos[0][0])
+        return None
+
+    @property
+    def multiplier(self):
+        if self.stage == "crashed" and self.inicio is not None:
+            return self.crash_point
+        return self.multiplicador_em(time.monotonic())
+
+    async def add_player(self, ctx, bet, alvo=None):
         if self.stage != "waiting":
             await ctx.send("O jogo de Crash já começou. Espere o próximo!")
             return False
@@ -212,21 +599,55 @@ class CrashGame:
             await ctx.send("Você já está nesta rodada do Crash.")
             return False
 
+        if await database.add_balance(ctx.author.id, carteira_delta=-bet) is None:
+            await ctx.send("Você não tem mais todo esse dinheiro na carteira para apostar.")
+            return False
+
         async with self.lock:
-            self.players[ctx.author.id] = bet
-            balance = database.get_balance(ctx.author.id)
-            database.update_balance(ctx.author.id, balance['carteira'] - bet, balance['banco'])
+            entrou = self.stage == "waiting" and ctx.author.id not in self.players
+            if entrou:
+                self.players[ctx.author.id] = bet
+                self.nomes[ctx.author.id] = ctx.author.display_name
+                self.manager.jogadores[ctx.author.id] = self
+                if alvo is not None:
+                    heapq.heappush(self.alvos, (alvo, ctx.author.id))
+                    self.alvo_de[ctx.author.id] = alvo
+                self.bot.journal.abrir(f"crash:{ctx.author.id}", ctx.author.id, bet, jogo="crash", rodada=self.rodada_id, alvo=alvo)
+            abrir = entrou and not self.abrindo
+            if abrir:
+                self.abrindo = True
+
+        if not entrou:
+            # A rodada começou (ou ele já entrou) enquanto a aposta era debitada: devolve
+            await database.add_balance(ctx.author.id, carteira_delta=bet)
+            await ctx.send("O jogo de Crash já começou. Espere o próximo!")
+            return False
 
+        if alvo is not None:
+            await ctx.send(f"{ctx.author.mention} entrou no Crash com **$ {bet:,}** e saque automático em **{alvo:.2f}x**!")
+        else:
             await ctx.send(f"{ctx.author.mention} entrou no Crash com **$ {bet:,}**!")
-            await self.bot.log_action(f"**Crash (Entrou)**: {ctx.author.mention} apostou `$ {bet:,}`.", discord.Color.blue())
-            await database.db_log(ctx.author.id, "CRASH_ENTRADA", f"Aposta: {bet}")
-
+        await self.bot.log_action(f"**Crash (Entrou)**: {ctx.author.mention} apostou `$ {bet:,}`.", discord.Color.blue(), PRIORIDADE_BAIXA)
+        await database.db_log(ctx.author.id, "CRASH_ENTRADA", f"Aposta: {bet}")
+        if abrir:
+            # Quem senta primeiro abre a rodada, seja o criador ou alguém que entrou enquanto a aposta dele era debitada
+            await self.start_game(ctx.channel)
         return True
 
+    async def cancelar_se_vazia(self):
+        """Fecha a rodada se ninguém conseguiu entrar (a aposta do criador falhou). Quem ainda estiver com a
+        aposta sendo debitada encontra a rodada fechada e é reembolsado."""
+        async with self.lock:
+            vazia = not self.abrindo
+            if vazia:
+                self.stage = "crashed"
+        if vazia:
+            self.manager.encerrar(self)
+
     def create_embed(self):
         if self.stage == "waiting":
             color = discord.Color.greyple()
-            desc = "Jogo de Crash vai começar em **10 segundos**!\nDigite `-crash <valor>` para entrar."
+            desc = f"Jogo de Crash vai começar em **{CRASH_ESPERA} segundos**!\nDigite `-crash <valor>` para entrar."
         elif self.stage == "running":
             color = discord.Color.gold()
             desc = f"Multiplicador: **{self.multiplier:.2f}x**\nDigite `-sacarcrash` para sair!"
@@ -238,132 +659,237 @@ class CrashGame:
 
         player_list_str = "Ninguém"
         if self.players:
-            player_list = []
-            for uid, bet in self.players.items():
-                user = self.bot.get_user(uid)
-                if user:
-                    player_list.append(f"{user.display_name}: $ {bet:,}")
-            if player_list:
-                player_list_str = "\n".join(player_list)
+            player_list_str = "\n".join(
+                f"{self.nomes.get(uid, uid)}: $ {bet:,}" + (f" (auto {self.alvo_de[uid]:.2f}x)" if uid in self.alvo_de else "")
+                for uid, bet in self.players.items()
+            )
         embed.add_field(name="Jogando Agora", value=player_list_str, inline=True)
 
         cashed_list_str = "Ninguém"
         if self.cashed_out:
-            cashed_list = []
-            for uid, multi in self.cashed_out.items():
-                user = self.bot.get_user(uid)
-                if user:
-                    cashed_list.append(f"{user.display_name}: {multi:.2f}x")
-            if cashed_list:
-                cashed_list_str = "\n".join(cashed_list)
+            cashed_list_str = "\n".join(f"{self.nomes.get(uid, uid)}: {multi:.2f}x" for uid, multi in self.cashed_out.items())
         embed.add_field(name="Saíram com Lucro", value=cashed_list_str, inline=True)
 
         return embed
 
     async def start_game(self, channel):
+        """Envia a mensagem da rodada e agenda o início no driver compartilhado."""
         self.message = await channel.send(embed=self.create_embed())
-        await asyncio.sleep(10)
+        self.manager.agendar(time.monotonic() + CRASH_ESPERA, self, "inicio")
 
+    async def iniciar(self):
+        """Chamado pelo driver quando acaba o tempo de espera."""
         async with self.lock:
-            if not self.players:
-                self.stage = "crashed"
+            cancelado = not self.players
+            self.stage = "crashed" if cancelado else "running"
+            if not cancelado:
+                self.inicio = time.monotonic()
+                self.fim = self.instante_do_alvo(self.crash_point)
+                proximo_alvo = self._proximo_alvo()
+
+        if cancelado:
+            self.manager.encerrar(self)
+            try:
                 await self.message.edit(embed=self.create_embed(), content="Ninguém entrou no Crash. Jogo cancelado.")
-                self.bot.current_crash_game = None
-                return
-
-            self.stage = "running"
-            await self.message.edit(embed=self.create_embed())
+            except discord.HTTPException as e:
+                print(f"Erro ao cancelar o Crash: {e}")
+            return
 
-        self.game_task = self.bot.loop.create_task(self.run_game_loop())
+        # Com o crash_point e o início no diário, uma queda depois da explosão não devolve apostas perdidas
+        agora = time.time()
+        self.bot.journal.abrir(
+            f"crashrodada:{self.rodada_id}", None, 0, inicio=agora, crash_point=self.crash_point,
+            explode_em=agora + (self.fim - time.monotonic()),
+            bonus=self.bot.happy_hour_multiplier if self.bot.happy_hour else 1
+        )
 
-    async def run_game_loop(self):
+        # O multiplicador é uma função do tempo, então o motor só precisa acordar na hora do crash
+        self.manager.agendar(self.fim, self, "crash")
+        if proximo_alvo is not None:
+            self.manager.agendar(proximo_alvo, self, "alvo")
+        self.manager.agendar(time.monotonic() + CRASH_RENDER_INTERVALO, self, "render")
         try:
-            crash_point = (1 / max(0.01, random.expovariate(1.0))) * 2.0 + 1.01
-
-            while self.multiplier < crash_point:
-                sleep_time = max(0.05, 0.5 / (self.multiplier * 0.5 + 1))
-                await asyncio.sleep(sleep_time)
-
-                async with self.lock:
-                    self.multiplier += 0.01 + (self.multiplier * 0.02)
-                    if self.message:
-                        await self.message.edit(embed=self.create_embed())
-
-            await self.end_game()
-
-        except asyncio.CancelledError:
-            print("Loop do Crash cancelado.")
-            self.stage = "crashed"
-            if self.message:
-                await self.message.edit(content="Jogo de Crash cancelado.", embed=None)
-            self.bot.current_crash_game = None
-        except Exception as e:
-            print(f"Erro no loop do Crash: {e}")
-            self.bot.current_crash_game = None
+            await self.message.edit(embed=self.create_embed())
+        except discord.HTTPException as e:
+            print(f"Erro ao iniciar o Crash: {e}")
 
-    async def player_cash_out(self, user):
-        if self.stage != "running":
+    async def renderizar(self):
+        """Edita a mensagem com o estado mais recente, sem segurar o lock do jogo durante a chamada ao Discord."""
+        try:
+            if self.stage == "running":
+                await self.message.edit(embed=self.create_embed())
+        except discord.HTTPException as e:
+            print(f"Erro ao renderizar o Crash: {e}")
+        finally:
+            self.renderizando = False
+
+    async def player_cash_out(self, user, instante=None):
+        """Saca o jogador com o multiplicador exato do instante do comando (time.monotonic()). Um saque pedido
+        antes do crash vale mesmo se for processado depois dele, até os perdedores serem liquidados."""
+        instante = instante if instante is not None else time.monotonic()
+        if self.inicio is None or self.liquidado or instante >= self.fim:
             await user.send("Você só pode sacar enquanto o jogo está rodando.")
             return
 
+        # O lock só protege a mudança de estado; banco, logs e DM acontecem depois de soltá-lo
         async with self.lock:
-            if user.id not in self.players:
+            if self.liquidado or user.id not in self.players:
                 return
-
             bet = self.players.pop(user.id)
-            self.cashed_out[user.id] = self.multiplier
+            self.manager.jogadores.pop(user.id, None)
+            multiplier = self.multiplicador_em(instante)
+            self.cashed_out[user.id] = multiplier
 
-            taxa = float(database.get_config('taxa_casa'))
-            multiplicador_real = self.multiplier
+        taxa = database.get_config('taxa_casa')
+        multiplicador_real = multiplier
 
-            if self.bot.happy_hour:
-                multiplicador_real *= self.bot.happy_hour_multiplier
+        if self.bot.happy_hour:
+            multiplicador_real *= self.bot.happy_hour_multiplier
 
-            ganhos = math.floor((bet * multiplicador_real) * (1 - taxa))
-            lucro = ganhos - bet
+        ganhos = math.floor((bet * multiplicador_real) * (1 - taxa))
+        lucro = ganhos - bet
 
-            balance = database.get_balance(user.id)
-            database.update_balance(user.id, balance['carteira'] + ganhos, balance['banco'])
+        await database.settle_bet(user.id, 0, ganhos, vitorias_add=1)
+        self.bot.journal.fechar(f"crash:{user.id}")
+        log_msg = f"**Crash (Saída)**: {user.mention} sacou em {multiplier:.2f}x e lucrou `$ {lucro:,}`."
+        if self.bot.happy_hour:
+            log_msg += " (HH)"
 
-            await database.update_stats(user.id, vitorias_add=1)
-            log_msg = f"**Crash (Saída)**: {user.mention} sacou em {self.multiplier:.2f}x e lucrou `$ {lucro:,}`."
-            if self.bot.happy_hour:
-                log_msg += " (HH)"
+        await self.bot.log_action(log_msg, discord.Color.green(), PRIORIDADE_BAIXA)
+        await database.db_log(user.id, "CRASH_SAIDA", f"Aposta: {bet}, Multi: {multiplier:.2f}, Lucro: {lucro}")
 
-            await self.bot.log_action(log_msg, discord.Color.green())
-            await database.db_log(user.id, "CRASH_SAIDA", f"Aposta: {bet}, Multi: {self.multiplier:.2f}, Lucro: {lucro}")
+        await user.send(f"Você sacou **$ {ganhos:,}** (lucro de $ {lucro:,}) com **{multiplier:.2f}x**!")
 
-            await user.send(f"Você sacou **$ {ganhos:,}** (lucro de $ {lucro:,}) com **{self.multiplier:.2f}x**!")
+    async def liquidar_alvos(self):
+        """Chamado pelo driver: saca de uma vez todos os jogadores cujo alvo já passou, cada um no seu alvo exato."""
+        async with self.lock:
+            if self.liquidado:
+                return
+            agora = time.monotonic()
+            sacados = []
+            while self.alvos and self.alvos[0][0] < self.crash_point and self.instante_do_alvo(self.alvos[0][0]) <= agora:
+                alvo, user_id = heapq.heappop(self.alvos)
+                if user_id not in self.players:
+                    continue # Já sacou manualmente
+                sacados.append((user_id, self.players.pop(user_id), alvo))
+                self.manager.jogadores.pop(user_id, None)
+                self.cashed_out[user_id] = alvo
+            proximo_alvo = self._proximo_alvo()
+
+        if proximo_alvo is not None:
+            self.manager.agendar(proximo_alvo, self, "alvo")
+        if not sacados:
+            return
 
-            if self.message:
-                await self.message.edit(embed=self.create_embed())
+        taxa = database.get_config('taxa_casa')
+        bonus = self.bot.happy_hour_multiplier if self.bot.happy_hour else 1
+        pagamentos = []
+        total_lucro = 0
+        for user_id, bet, alvo in sacados:
+            ganhos = math.floor((bet * alvo * bonus) * (1 - taxa))
+            pagamentos.append((user_id, ganhos))
+            total_lucro += ganhos - bet
+
+        detalhes = "Saques: " + ", ".join(f"{uid}:{bet}@{alvo:.2f}" for uid, bet, alvo in sacados)
+        await database.settle_crash_cashouts(pagamentos, "CRASH_SAIDA_AUTO", detalhes)
+        for user_id, _ in pagamentos:
+            self.bot.journal.fechar(f"crash:{user_id}")
+
+        log_msg = f"**Crash (Saque Automático)**: {len(sacados)} jogador(es) sacaram e lucraram `$ {total_lucro:,}` no total."
+        if self.bot.happy_hour:
+            log_msg += " (HH)"
+        await self.bot.log_action(log_msg, discord.Color.green(), PRIORIDADE_BAIXA)
 
     async def end_game(self):
         async with self.lock:
             if self.stage == "crashed": return
             self.stage = "crashed"
+        # A rodada sai da rota na hora (o próximo -crash abre outra), mas os jogadores dela ainda podem sacar
+        # por um instante: o -sacarcrash enviado antes do crash pode estar esperando cooldown ou o banco
+        self.manager.fechar_rodada(self)
+        await asyncio.sleep(CRASH_TOLERANCIA_SAQUE)
 
-            if self.message:
-                await self.message.edit(embed=self.create_embed())
-
-            if not self.players:
-                if self.message:
-                    await self.message.channel.send("Todos saíram a tempo! Ninguém perdeu.")
+        async with self.lock:
+            self.liquidado = True
+            perdedores = dict(self.players)
+            self.manager.encerrar(self)
+
+        # Primeiro o dinheiro e o diário: uma falha do Discord depois disso não deixa a rodada aberta
+        self.bot.journal.fechar(f"crashrodada:{self.rodada_id}")
+        if perdedores:
+            # Liquidação em lote: uma transação e um log para a rodada inteira, qualquer que seja o número de jogadores
+            total_perdido = sum(perdedores.values())
+            detalhes = f"Multi: {self.crash_point:.2f}, Perdedores: " + ", ".join(f"{uid}:{bet}" for uid, bet in perdedores.items())
+            await database.settle_crash_round(perdedores.keys(), "CRASH_DERROTA", detalhes)
+            for user_id in perdedores:
+                self.bot.journal.fechar(f"crash:{user_id}")
+
+            perdedores_msg = " ".join(f"<@{uid}>" for uid in perdedores)
+            if len(perdedores_msg) > 1500:
+                perdedores_msg = f"**{len(perdedores)} jogadores**"
+            await self.bot.log_action(
+                f"**Crash (Derrota)**: {perdedores_msg} perderam `$ {total_perdido:,}` no crash em {self.crash_point:.2f}x.",
+                discord.Color.red(), PRIORIDADE_BAIXA
+            )
+
+        if not self.message:
+            return
+        try:
+            await self.message.edit(embed=self.create_embed())
+            if perdedores:
+                await self.message.channel.send(f"{perdedores_msg} não saíram a tempo e perderam suas apostas!")
             else:
-                perdedores_msg = ""
-                for user_id, bet in self.players.items():
-                    user = self.bot.get_user(user_id)
-                    if user:
-                        perdedores_msg += f"{user.mention} "
-
-                    await database.update_stats(user_id, derrotas_add=1)
-                    await self.bot.log_action(f"**Crash (Derrota)**: {user.mention if user else f'ID {user_id}'} perdeu `$ {bet:,}`.", discord.Color.red())
-                    await database.db_log(user_id, "CRASH_DERROTA", f"Aposta: {bet}, Multi: {self.multiplier:.2f}")
-
-                if self.message:
-                    await self.message.channel.send(f"{perdedores_msg} não saíram a tempo e perderam suas apostas!")
+                await self.message.channel.send("Todos saíram a tempo! Ninguém perdeu.")
+        except discord.HTTPException as e:
+            print(f"Erro ao mostrar o fim do Crash: {e}")
 
-            self.bot.current_crash_game = None
+class CrashManager:
+    """Rodadas de Crash independentes por servidor. Os eventos de todas elas (início, renderização, alvos e crash)
+    ficam no TimerService do bot, sem nenhuma task própria por rodada."""
+    def __init__(self, bot):
+        self.bot = bot
+        self.rodadas = {}   # chave (guild/canal) -> CrashGame
+        self.jogadores = {} # user_id -> CrashGame em que ele ainda está apostado
+
+    def rodada(self, chave):
+        return self.rodadas.get(chave)
+
+    def jogo_do_jogador(self, user_id):
+        return self.jogadores.get(user_id)
+
+    def nova_rodada(self, chave):
+        game = CrashGame(self.bot, self, chave)
+        self.rodadas[chave] = game
+        return game
+
+    def fechar_rodada(self, game):
+        """Tira a rodada da rota por servidor, para a próxima entrada abrir uma nova."""
+        if self.rodadas.get(game.chave) is game:
+            del self.rodadas[game.chave]
+
+    def encerrar(self, game):
+        """Tira a rodada das tabelas de rota (os eventos pendentes dela são ignorados ao vencer)."""
+        self.fechar_rodada(game)
+        for user_id in game.players:
+            if self.jogadores.get(user_id) is game:
+                del self.jogadores[user_id]
+
+    def agendar(self, instante, game, tipo):
+        self.bot.timers.agendar_em(instante, self._disparar, game, tipo)
+
+    def _disparar(self, game, tipo):
+        """Trata um evento vencido. Todo I/O vira uma task separada para o timer nunca esperar a rede."""
+        if tipo == "inicio" and game.stage == "waiting":
+            self.bot.timers.criar_task(game.iniciar())
+        elif tipo == "alvo" and game.stage == "running":
+            self.bot.timers.criar_task(game.liquidar_alvos())
+        elif tipo == "crash" and game.stage == "running":
+            self.bot.timers.criar_task(game.end_game())
+        elif tipo == "render" and game.stage == "running":
+            if not game.renderizando:
+                game.renderizando = True
+                self.bot.timers.criar_task(game.renderizar())
+            self.agendar(time.monotonic() + CRASH_RENDER_INTERVALO, game, "render")
 
 class Duelo:
     """Guarda o estado de um desafio de duelo."""
@@ -372,6 +898,7 @@ class Duelo:
         self.target = target
         self.bet = bet
         self.created_at = datetime.datetime.now()
+        self.timer = None # Expiração no TimerService, cancelada ao aceitar/recusar
 
 
 # --- Classe Principal do Cog ---
@@ -379,6 +906,18 @@ class Duelo:
 class JogosComplexos(commands.Cog):
     def __init__(self, bot):
         self.bot = bot # Armazena a instância do bot principal
+        if self.bot.crash_manager is None:
+            self.bot.crash_manager = CrashManager(self.bot)
+        if self.bot.blackjack_reaper is None:
+            self.bot.blackjack_reaper = BlackjackReaper(self.bot)
+
+    def shoe_de(self, ctx):
+        """Sapato de Blackjack do servidor (ou do canal, em DMs), criado na primeira mão."""
+        chave = ctx.guild.id if ctx.guild else ctx.channel.id
+        shoe = self.bot.shoes.get(chave)
+        if shoe is None:
+            shoe = self.bot.shoes[chave] = Shoe()
+        return shoe
 
     # --- Comandos de Blackjack ---
     @commands.command(name='blackjack', aliases=['bj'])
@@ -388,17 +927,39 @@ class JogosComplexos(commands.Cog):
         author_id = ctx.author.id
         if author_id in self.bot.active_blackjack_games:
             return await ctx.send("Você já tem um jogo de Blackjack em andamento.")
-        if self.bot.current_crash_game and author_id in self.bot.current_crash_game.players:
+        if self.bot.crash_manager.jogo_do_jogador(author_id):
             return await ctx.send("Você não pode jogar Blackjack enquanto está no Crash!")
 
         # Usamos a função de verificação que está DENTRO do bot
         aposta_valida, amount = await self.bot.verificar_e_processar_aposta(ctx, ctx.author, valor)
         if not aposta_valida: return
 
-        game = BlackjackGame(self.bot, ctx, amount)
+        game = BlackjackGame(self.bot, ctx, amount, self.shoe_de(ctx))
         self.bot.active_blackjack_games[author_id] = game
         await game.start_game()
 
+    @commands.command(name='mesa', aliases=['bjmesa'])
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    async def mesa(self, ctx, *, valor: str):
+        """Senta em uma mesa de Blackjack com vários jogadores (uma por canal)."""
+        author_id = ctx.author.id
+        if author_id in self.bot.active_blackjack_games:
+            return await ctx.send("Você já tem um jogo de Blackjack em andamento.")
+        if self.bot.crash_manager.jogo_do_jogador(author_id):
+            return await ctx.send("Você não pode jogar Blackjack enquanto está no Crash!")
+
+        aposta_valida, amount = await self.bot.verificar_e_processar_aposta(ctx, ctx.author, valor)
+        if not aposta_valida: return
+
+        mesa = self.bot.mesas_blackjack.get(ctx.channel.id)
+        if mesa is None or mesa.stage != "waiting":
+            mesa = BlackjackTable(self.bot, ctx.channel, ctx.channel.id, self.shoe_de(ctx))
+            self.bot.mesas_blackjack[ctx.channel.id] = mesa
+        if not await mesa.add_player(ctx, amount) and not mesa.assentos:
+            # Outra entrada pode já ter tirado esta mesa (ou posto uma nova no lugar) durante os awaits
+            if self.bot.mesas_blackjack.get(ctx.channel.id) is mesa:
+                del self.bot.mesas_blackjack[ctx.channel.id]
+
     @commands.command(name='hit')
     @commands.cooldown(1, 2, commands.BucketType.user)
     async def hit(self, ctx):
@@ -420,31 +981,46 @@ class JogosComplexos(commands.Cog):
     # --- Comandos do Crash ---
     @commands.command(name='crash')
     @commands.cooldown(1, 5, commands.BucketType.user)
-    async def crash(self, ctx, *, valor: str):
-        """Entra no próximo jogo de Crash."""
+    async def crash(self, ctx, valor: str, alvo: str = None):
+        """Entra no próximo jogo de Crash, opcionalmente com um multiplicador de saque automático."""
         author_id = ctx.author.id
         if author_id in self.bot.active_blackjack_games:
             return await ctx.send("Você não pode entrar no Crash enquanto joga Blackjack!")
 
+        if alvo is not None:
+            try:
+                alvo = round(float(alvo.lower().rstrip('x').replace(',', '.')), 2)
+            except ValueError:
+                return await ctx.send("Alvo inválido. Use algo como `2` ou `2.5x`.")
+            if not CRASH_ALVO_MINIMO <= alvo <= CRASH_ALVO_MAXIMO:
+                return await ctx.send(f"O alvo precisa estar entre **{CRASH_ALVO_MINIMO:.2f}x** e **{CRASH_ALVO_MAXIMO:,.0f}x**.")
+
         aposta_valida, amount = await self.bot.verificar_e_processar_aposta(ctx, ctx.author, valor)
         if not aposta_valida: return
 
-        if self.bot.current_crash_game is None:
-            self.bot.current_crash_game = CrashGame(self.bot)
-            await self.bot.current_crash_game.add_player(ctx, amount)
-            await self.bot.current_crash_game.start_game(ctx.channel)
+        if self.bot.crash_manager.jogo_do_jogador(author_id):
+            return await ctx.send("Você já está em uma rodada do Crash.")
+
+        # Cada servidor tem a sua rodada (em DMs, cada canal)
+        chave = ctx.guild.id if ctx.guild else ctx.channel.id
+        game = self.bot.crash_manager.rodada(chave)
+        if game is None:
+            game = self.bot.crash_manager.nova_rodada(chave)
+            if not await game.add_player(ctx, amount, alvo):
+                await game.cancelar_se_vazia()
         else:
-            await self.bot.current_crash_game.add_player(ctx, amount)
+            await game.add_player(ctx, amount, alvo)
 
     @commands.command(name='sacarcrash')
     @commands.cooldown(1, 2, commands.BucketType.user)
     async def sacarcrash(self, ctx):
         """Sai do jogo de Crash com o multiplicador atual."""
-        game = self.bot.current_crash_game
+        instante = ctx.recebido_em # Multiplicador do momento em que a mensagem chegou (get_context), não de quando for processada
+        game = self.bot.crash_manager.jogo_do_jogador(ctx.author.id)
         if not game:
-            return await ctx.send("Não há nenhum jogo de Crash rodando.", delete_after=5)
+            return await ctx.send("Você não está em nenhum jogo de Crash rodando.", delete_after=5)
 
-        await game.player_cash_out(ctx.author)
+        await game.player_cash_out(ctx.author, instante)
         try:
             await ctx.message.delete()
         except discord.errors.NotFound:
@@ -467,22 +1043,24 @@ class JogosComplexos(commands.Cog):
         if not aposta_valida: return
 
         await database.check_user(target.id)
-        target_balance = database.get_balance(target.id)
+        target_balance = await database.get_balance(target.id)
         if target_balance['carteira'] < amount:
             return await ctx.send(f"{target.display_name} não tem **$ {amount:,}** na carteira para aceitar este duelo.")
 
         novo_duelo = Duelo(author, target, amount)
+        # O prazo existe antes do duelo ficar visível: um -aceitar/-recusar durante o send já pode cancelá-lo
+        novo_duelo.timer = self.bot.timers.agendar(DUELO_EXPIRA, self.expirar_duelo, ctx.channel, novo_duelo)
         self.bot.active_duelos[target.id] = novo_duelo
 
         await ctx.send(
             f"⚔️ **DESAFIO!** ⚔️\n{target.mention}, {author.mention} te desafiou para um duelo valendo **$ {amount:,}**!\n"
-            f"Você tem 60 segundos para digitar `-aceitar` ou `-recusar`."
+            f"Você tem {DUELO_EXPIRA} segundos para digitar `-aceitar` ou `-recusar`."
         )
 
-        await asyncio.sleep(60)
-        if target.id in self.bot.active_duelos:
-            del self.bot.active_duelos[target.id]
-            await ctx.send(f"O desafio de {author.mention} para {target.mention} expirou.")
+    async def expirar_duelo(self, channel, duelo):
+        if self.bot.active_duelos.get(duelo.target.id) is duelo:
+            del self.bot.active_duelos[duelo.target.id]
+            await channel.send(f"O desafio de {duelo.author.mention} para {duelo.target.mention} expirou.")
 
     @commands.command(name='aceitar')
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -495,22 +1073,12 @@ class JogosComplexos(commands.Cog):
             return await ctx.send("Você não tem nenhum desafio pendente.")
 
         del self.bot.active_duelos[author_id]
+        duelo.timer.cancelar()
 
         author = duelo.author
         target = duelo.target
         bet = duelo.bet
 
-        author_balance = database.get_balance(author.id)
-        target_balance = database.get_balance(target.id)
-
-        if author_balance['carteira'] < bet:
-            return await ctx.send(f"{author.mention} não tem mais o dinheiro para o duelo.")
-        if target_balance['carteira'] < bet:
-            return await ctx.send(f"Você não tem mais o dinheiro para o duelo.")
-
-        database.update_balance(author.id, author_balance['carteira'] - bet, author_balance['banco'])
-        database.update_balance(target.id, target_balance['carteira'] - bet, target_balance['banco'])
-
         author_roll = random.randint(1, 100)
         target_roll = random.randint(1, 100)
 
@@ -532,19 +1100,20 @@ class JogosComplexos(commands.Cog):
             ganhador = target
             perdedor = author
 
-        taxa = float(database.get_config('taxa_casa'))
+        taxa = database.get_config('taxa_casa')
         premio = math.floor((bet * 2) * (1 - taxa))
         lucro = premio - bet
 
-        ganhador_balance = database.get_balance(ganhador.id)
-        database.update_balance(ganhador.id, ganhador_balance['carteira'] + premio, ganhador_balance['banco'])
+        # Débito dos dois, prêmio e stats em uma única transação
+        if not await database.settle_duel(ganhador.id, perdedor.id, bet, premio):
+            author_balance = await database.get_balance(author.id)
+            if author_balance['carteira'] < bet:
+                return await ctx.send(f"{author.mention} não tem mais o dinheiro para o duelo.")
+            return await ctx.send(f"Você não tem mais o dinheiro para o duelo.")
 
         embed.description = f"**{ganhador.mention} venceu** e ganhou **$ {premio:,}** (Lucro: $ {lucro:,})!"
         await ctx.send(embed=embed)
 
-        await database.update_stats(ganhador.id, vitorias_add=1)
-        await database.update_stats(perdedor.id, derrotas_add=1)
-
         log_msg = f"**Duelo (Vitória)**: {ganhador.mention} venceu {perdedor.mention} e lucrou `$ {lucro:,}` (Aposta: `$ {bet:,}`)."
         await self.bot.log_action(log_msg, discord.Color.green())
         await database.db_log(ganhador.id, "DUELO_VITORIA", f"Aposta: {bet}, Vs: {perdedor.id}, Roll: {author_roll}v{target_roll}")
@@ -560,6 +1129,7 @@ class JogosComplexos(commands.Cog):
             return await ctx.send("Você não tem nenhum desafio pendente.")
 
         del self.bot.active_duelos[ctx.author.id]
+        duelo.timer.cancelar()
         await ctx.send(f"Você recusou o desafio de {duelo.author.mention}.")
 
 
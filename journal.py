@@ -0,0 +1,133 @@
+# journal.py
+import json
+import math
+import os
+
+import database
+from constantes import CRASH_CRESCIMENTO
+
+# --- Diário de Jogos Abertos ---
+# Toda aposta debitada de um jogo ainda em andamento (Blackjack, mesa, Crash) ganha uma linha aqui,
+# e outra quando é liquidada. Se o processo cair no meio, a próxima inicialização lê o arquivo
+# e resolve tudo o que ficou aberto em uma única transação.
+
+JOURNAL_ARQUIVO = "jogos_abertos.jsonl"
+JOURNAL_COMPACTAR = 5000 # Linhas escritas antes de reescrever o arquivo só com os jogos abertos
+
+
+class GameJournal:
+    """Diário só de acréscimo (JSON por linha) dos jogos com aposta já debitada."""
+    def __init__(self, caminho=JOURNAL_ARQUIVO):
+        self.caminho = caminho
+        self.arquivo = None
+        self.abertos = {} # chave -> estado mais recente do jogo
+        self.linhas = 0
+        self.restaurado = False
+        # Jogos que a execução anterior deixou abertos, lidos antes de qualquer abrir() desta execução
+        self.anteriores = self._ler()
+        # Última escrita da execução anterior: o processo com certeza estava vivo até aqui
+        try:
+            self.ultima_escrita = os.path.getmtime(caminho)
+        except OSError:
+            self.ultima_escrita = None
+
+    def _escrever(self, registro):
+        if self.arquivo is None:
+            self.arquivo = open(self.caminho, "a", encoding="utf-8")
+        self.arquivo.write(json.dumps(registro, separators=(",", ":")) + "\n")
+        self.arquivo.flush()
+        self.linhas += 1
+        if self.linhas >= JOURNAL_COMPACTAR:
+            self._compactar()
+
+    def abrir(self, chave, user_id, bet, **estado):
+        """Registra uma aposta debitada. `estado` guarda o que for útil para entender o jogo depois (mão, sapato, etc.)."""
+        registro = {"op": "a", "k": chave, "u": user_id, "b": bet, **estado}
+        self.abertos[chave] = registro
+        self._escrever(registro)
+
+    def atualizar(self, chave, **estado):
+        if chave not in self.abertos:
+            return
+        self.abertos[chave].update(estado)
+        self._escrever({"op": "u", "k": chave, **estado})
+
+    def fechar(self, chave):
+        if self.abertos.pop(chave, None) is not None:
+            self._escrever({"op": "f", "k": chave})
+
+    def _compactar(self):
+        """Reescreve o arquivo só com os jogos ainda abertos (troca atômica com os.replace)."""
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            for registro in self.abertos.values():
+                f.write(json.dumps(registro, separators=(",", ":")) + "\n")
+        os.replace(temporario, self.caminho)
+        self.linhas = len(self.abertos)
+
+    def close(self):
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+
+    def _ler(self):
+        """Reaplica o arquivo e devolve {chave: estado} dos jogos que ficaram abertos (só no __init__)."""
+        abertos = {}
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue # Última linha cortada pela queda
+                    chave = registro.pop("k")
+                    op = registro.pop("op")
+                    if op == "a":
+                        abertos[chave] = registro
+                    elif op == "u" and chave in abertos:
+                        abertos[chave].update(registro)
+                    elif op == "f":
+                        abertos.pop(chave, None)
+        except FileNotFoundError:
+            pass
+        return abertos
+
+    async def restaurar(self):
+        """Resolve em lote os jogos abertos da execução anterior. Uma aposta do Crash só é decidida pelo que
+        aconteceu antes da queda do processo (última escrita no diário): alvo alcançado paga, rodada explodida perde.
+        Todo o resto tem a aposta devolvida. Roda uma vez só. Retorna (reembolsos, derrotas)."""
+        if self.restaurado:
+            return 0, 0
+        self.restaurado = True
+
+        abertos, self.anteriores = self.anteriores, {}
+        rodadas = {chave: estado for chave, estado in abertos.items() if chave.startswith("crashrodada:")}
+        queda = self.ultima_escrita if self.ultima_escrita is not None else 0
+        taxa = database.get_config('taxa_casa')
+        resultados = []
+        for chave, estado in abertos.items():
+            if estado.get("u") is None:
+                continue # Registro da rodada, não uma aposta
+            rodada = rodadas.get(f"crashrodada:{estado.get('rodada')}")
+            alvo = estado.get("alvo")
+            if (rodada and alvo is not None and alvo < rodada["crash_point"]
+                    and rodada["inicio"] + math.log(alvo) / CRASH_CRESCIMENTO <= queda):
+                # O saque automático aconteceu antes da queda, só não chegou a ser pago
+                bonus = rodada.get("bonus", 1)
+                resultados.append((estado["u"], math.floor(estado["b"] * alvo * bonus * (1 - taxa)), 1, 0))
+            elif rodada and rodada["explode_em"] <= queda:
+                resultados.append((estado["u"], 0, 0, 1))
+            else:
+                resultados.append((estado["u"], estado["b"], 0, 0))
+
+        if resultados:
+            detalhes = "Jogos abertos na queda: " + ", ".join(f"{uid}:{ganhos}" for uid, ganhos, _, _ in resultados)
+            await database.settle_results(resultados, "JOGOS_RESTAURADOS", detalhes)
+
+        # self.abertos só tem jogos desta execução: a compactação descarta os da anterior e mantém esses
+        self._compactar()
+        derrotas = sum(1 for r in resultados if r[3])
+        return len(resultados) - derrotas, derrotas
@@ -0,0 +1,346 @@
+# loadtest.py
+# Teste de carga de ponta a ponta: roda os comandos reais do main.py e do Cog de jogos com milhares de
+# jogadores simultâneos, sem Discord. Context, Member, Message e canais são falsos e só contam envios e edições;
+# o banco é um SQLite temporário. Mostra latência p50/p95/p99 e chamadas ao banco por comando, e o atraso do event loop.
+#
+# Uso:
+#   python loadtest.py                                   # 500 jogadores, 20 comandos cada, mistura padrão
+#   python loadtest.py --jogadores 2000 --comandos 50
+#   python loadtest.py --mix coin=5,slots=5,blackjack=2,crash=1
+#   python loadtest.py --com-pausas --com-cooldown       # mantém as animações (asyncio.sleep) e os cooldowns
+#
+# Comandos que recebem @menção (pagar, duelo) e os de admin ficam de fora: eles dependem de objetos reais do Discord.
+# crash e mesa podem entrar no --mix, mas as rodadas deles seguem o relógio real (TimerService) e podem não terminar antes do fim do teste.
+import argparse
+import asyncio
+import contextvars
+import datetime
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+# O main.py lê estas variáveis ao ser importado
+os.environ.setdefault("DISCORD_TOKEN", "loadtest")
+os.environ.setdefault("ADMIN_ROLE_ID", "1")
+os.environ.setdefault("LOG_CHANNEL_ID", "1")
+
+MIX_PADRAO = "coin=20,dice=15,roleta=10,slots=20,saldo=10,perfil=5,rank=5,depositar=5,sacar=5,blackjack=5"
+SALDO_INICIAL = 10_000_000
+INTERVALO_LAG = 0.05 # Segundos entre as medições de atraso do event loop
+
+_comando_atual = contextvars.ContextVar("comando_atual", default=None)
+_ids = itertools.count(1_000_000)
+
+
+class Registro:
+    """Contadores de tudo o que os comandos mandariam para o Discord."""
+    def __init__(self):
+        self.envios = 0
+        self.edicoes = 0
+        self.dms = 0
+        self.delecoes = 0
+
+
+registro = Registro()
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content=""):
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = getattr(channel, "guild", None)
+        self.author = author
+        self.content = content
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.edited_at = None
+        self.mentions = []
+        self.embeds = []
+        self.attachments = []
+        self.reactions = []
+        self._state = None
+
+    async def edit(self, **kwargs):
+        registro.edicoes += 1
+        return self
+
+    async def delete(self, **kwargs):
+        registro.delecoes += 1
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = f"Servidor {guild_id}"
+        self.members = []
+        self._membros = {}
+
+    def adicionar(self, member):
+        self.members.append(member)
+        self._membros[member.id] = member
+
+    def get_member(self, user_id):
+        return self._membros.get(user_id)
+
+    def get_role(self, role_id):
+        return None
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.guild = guild
+        self.bot_user = None
+
+    async def send(self, content=None, **kwargs):
+        registro.envios += 1
+        return FakeMessage(self, self.bot_user, content or "")
+
+
+class FakeMember:
+    def __init__(self, user_id, guild):
+        self.id = user_id
+        self.name = f"jogador{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.avatar = None
+        self.display_avatar = None
+        self.roles = []
+        self.guild = guild
+
+    async def send(self, content=None, **kwargs):
+        registro.dms += 1
+        return FakeMessage(None, None, content or "")
+
+
+class FakeContext(commands.Context):
+    """Context de verdade do discord.py, só com o envio trocado pelo canal falso."""
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class LoadTest:
+    def __init__(self, args, main):
+        self.args = args
+        self.main = main
+        self.bot = main.bot
+        self.latencias = {}   # comando -> [segundos]
+        self.chamadas_db = {} # comando -> chamadas ao banco
+        self.erros = {}       # comando -> erros
+        self.lags = []
+        self.rodando = True
+        self.mix = []
+        for item in args.mix.split(","):
+            nome, peso = item.split("=")
+            self.mix.append((nome.strip(), float(peso)))
+
+    # --- Preparação ---
+
+    def _desativar_pausas(self):
+        """Troca asyncio.sleep por um yield nos módulos dos jogos, para medir o bot e não as animações."""
+        real = asyncio
+
+        class SemPausas:
+            def __getattr__(self, nome):
+                return getattr(real, nome)
+
+            async def sleep(self, delay, result=None):
+                await real.sleep(0)
+                return result
+
+        import jogos_complexos
+        self.main.asyncio = SemPausas()
+        jogos_complexos.asyncio = SemPausas()
+
+    def _desativar_cooldowns(self):
+        for comando in self.bot.walk_commands():
+            comando._buckets = commands.CooldownMapping(None, commands.BucketType.default)
+
+    def _contar_chamadas_db(self):
+        """Toda função do database.py passa por loop.run_in_executor; conta cada chamada para o comando que a fez."""
+        loop = asyncio.get_running_loop()
+        original = loop.run_in_executor
+
+        def run_in_executor(executor, func, *args):
+            comando = _comando_atual.get()
+            if comando is not None:
+                self.chamadas_db[comando] = self.chamadas_db.get(comando, 0) + 1
+            return original(executor, func, *args)
+
+        loop.run_in_executor = run_in_executor
+
+    async def preparar(self):
+        import database
+        await self.bot._async_setup_hook() # O que o login faria: prende o bot ao loop atual
+        await database.init_db()
+        await self.bot.journal.restaurar()
+        await self.bot.load_extension("jogos_complexos")
+        if not self.args.com_pausas:
+            self._desativar_pausas()
+        if not self.args.com_cooldown:
+            self._desativar_cooldowns()
+        self.bot.add_listener(self._erro, "on_command_error")
+
+        # Tasks de fundo criadas aqui, fora de qualquer comando, para não herdarem o comando atual
+        database._log_writer._ensure_started()
+        self.bot.timers.agendar(0, lambda: None)
+        self.bot.log_dispatcher.start()
+        self._contar_chamadas_db()
+
+        self.guilds = [FakeGuild(next(_ids)) for _ in range(self.args.servidores)]
+        self.canais = {guild.id: FakeChannel(next(_ids), guild) for guild in self.guilds}
+        self.jogadores = []
+        for i in range(self.args.jogadores):
+            guild = self.guilds[i % len(self.guilds)]
+            member = FakeMember(next(_ids), guild)
+            guild.adicionar(member)
+            self.jogadores.append(member)
+            await database.check_user(member.id)
+            await database.add_balance(member.id, carteira_delta=SALDO_INICIAL)
+
+    async def _erro(self, ctx, error):
+        if isinstance(error, commands.CommandNotFound):
+            return
+        nome = ctx.command.name if ctx.command else "?"
+        self.erros[nome] = self.erros.get(nome, 0) + 1
+
+    # --- Execução ---
+
+    def _texto(self, comando):
+        aposta = self.args.aposta
+        if comando == "coin":
+            return f"-coin {random.choice(['cara', 'coroa'])} {aposta}"
+        if comando == "dice":
+            return f"-dice {random.randint(10, 90)} {aposta}"
+        if comando == "roleta":
+            return f"-roleta {random.choice(['vermelho', 'preto', 'verde'])} {aposta}"
+        if comando in ("slots", "blackjack", "mesa"):
+            return f"-{comando} {aposta}"
+        if comando == "crash":
+            return f"-crash {aposta} {random.choice(['1.5', '2', '3'])}"
+        if comando in ("depositar", "sacar"):
+            return f"-{comando} {aposta}"
+        return f"-{comando}"
+
+    async def invocar(self, member, texto):
+        channel = self.canais[member.guild.id]
+        message = FakeMessage(channel, member, texto)
+        view = StringView(texto)
+        ctx = FakeContext(prefix="-", view=view, bot=self.bot, message=message)
+        ctx.recebido_em = time.monotonic() # O que o get_context do bot marcaria
+        view.skip_string("-")
+        ctx.invoked_with = view.get_word()
+        ctx.command = self.bot.all_commands.get(ctx.invoked_with)
+        if ctx.command is None:
+            raise ValueError(f"Comando desconhecido no mix: {texto}")
+
+        nome = ctx.command.name
+        _comando_atual.set(nome)
+        inicio = time.perf_counter()
+        await self.bot.invoke(ctx)
+        self.latencias.setdefault(nome, []).append(time.perf_counter() - inicio)
+
+    async def jogador(self, member):
+        nomes = [nome for nome, _ in self.mix]
+        pesos = [peso for _, peso in self.mix]
+        for _ in range(self.args.comandos):
+            comando = random.choices(nomes, weights=pesos)[0]
+            # Cada comando roda em uma task própria, com o contexto (e a contagem de chamadas ao banco) só dele
+            await asyncio.create_task(self.invocar(member, self._texto(comando)), context=contextvars.Context())
+            if comando == "blackjack":
+                for _ in range(12): # Uma mão nunca passa de 11 cartas; o limite só evita travar o teste
+                    if member.id not in self.bot.active_blackjack_games:
+                        break
+                    acao = "-hit" if random.random() < 0.4 else "-stand"
+                    await asyncio.create_task(self.invocar(member, acao), context=contextvars.Context())
+            if self.args.intervalo:
+                await asyncio.sleep(random.uniform(0, 2 * self.args.intervalo))
+
+    async def medir_lag(self):
+        while self.rodando:
+            inicio = time.perf_counter()
+            await asyncio.sleep(INTERVALO_LAG)
+            self.lags.append(time.perf_counter() - inicio - INTERVALO_LAG)
+
+    async def rodar(self):
+        await self.preparar()
+        print(f"{len(self.jogadores)} jogadores em {len(self.guilds)} servidores, {self.args.comandos} comandos cada...")
+        monitor = asyncio.create_task(self.medir_lag(), context=contextvars.Context())
+        inicio = time.perf_counter()
+        await asyncio.gather(*(self.jogador(member) for member in self.jogadores))
+        duracao = time.perf_counter() - inicio
+        self.rodando = False
+        await monitor
+        self.relatorio(duracao)
+        await self.encerrar()
+
+    async def encerrar(self):
+        import database
+        self.bot.timers.stop()
+        await self.bot.log_dispatcher.stop()
+        self.bot.journal.close()
+        await database.close_connections()
+
+    # --- Relatório ---
+
+    def relatorio(self, duracao):
+        total = sum(len(v) for v in self.latencias.values())
+        print()
+        print(f"{'Comando':<12} {'Qtd':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'DB/cmd':>7} {'Erros':>6}")
+        for nome in sorted(self.latencias, key=lambda n: -len(self.latencias[n])):
+            valores = sorted(self.latencias[nome])
+            print(
+                f"{nome:<12} {len(valores):>7} {percentil(valores, 50) * 1000:>9.2f} {percentil(valores, 95) * 1000:>9.2f} "
+                f"{percentil(valores, 99) * 1000:>9.2f} {self.chamadas_db.get(nome, 0) / len(valores):>7.2f} {self.erros.get(nome, 0):>6}"
+            )
+
+        lags = sorted(self.lags)
+        print()
+        print(f"Total: {total} comandos em {duracao:.2f}s ({total / duracao:,.0f} comandos/s)")
+        print(f"Chamadas ao banco: {sum(self.chamadas_db.values())}")
+        print(f"Discord: {registro.envios} envios, {registro.edicoes} edições, {registro.dms} DMs, {registro.delecoes} deleções")
+        print(
+            f"Atraso do event loop: p50 {percentil(lags, 50) * 1000:.2f} ms, p99 {percentil(lags, 99) * 1000:.2f} ms, "
+            f"máx {(lags[-1] if lags else 0) * 1000:.2f} ms"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do Cassino com o Discord simulado.")
+    parser.add_argument("--jogadores", type=int, default=500, help="Jogadores simultâneos")
+    parser.add_argument("--comandos", type=int, default=20, help="Comandos por jogador")
+    parser.add_argument("--servidores", type=int, default=5, help="Servidores (guilds) entre os quais os jogadores se dividem")
+    parser.add_argument("--mix", default=MIX_PADRAO, help="Pesos dos comandos, ex: coin=5,slots=5,blackjack=2")
+    parser.add_argument("--aposta", type=int, default=100, help="Valor de cada aposta")
+    parser.add_argument("--intervalo", type=float, default=0, help="Pausa média entre os comandos de um jogador (s)")
+    parser.add_argument("--com-pausas", action="store_true", help="Mantém os asyncio.sleep das animações dos jogos")
+    parser.add_argument("--com-cooldown", action="store_true", help="Mantém os cooldowns dos comandos")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    random.seed(args.seed)
+
+    # Banco, diário e tudo o que o bot grava ficam em uma pasta temporária
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="cassino-loadtest-"))
+    import main as bot_main
+
+    asyncio.run(LoadTest(args, bot_main).rodar())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# log_dispatcher.py
+import discord
+import asyncio
+import collections
+import datetime
+import time
+
+# --- Configuração do Despachante de Logs ---
+MAX_EMBEDS_POR_MENSAGEM = 10    # Limite do Discord por mensagem
+MAX_DESCRICAO_EMBED = 4096
+JANELA_AGRUPAMENTO = 1.0        # Segundos esperando mais logs antes de enviar (junta rajadas)
+INTERVALO_MINIMO_ENVIO = 1.2    # ~5 mensagens a cada 5s, o limite por canal do Discord
+MAX_FILA = 500                  # Acima disso, logs de baixa prioridade são descartados
+
+PRIORIDADE_ALTA = 0     # Admin, jackpot, reset, happy hour
+PRIORIDADE_NORMAL = 1   # Pagamentos, daily, duelos
+PRIORIDADE_BAIXA = 2    # Apostas comuns, depósitos e saques
+
+
+class LogDispatcher:
+    """Fila em segundo plano que envia os logs ao canal em lotes de até 10 embeds por mensagem."""
+    def __init__(self, bot, channel_id):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.importantes = collections.deque()
+        self.baixas = collections.deque()
+        self.novo_log = asyncio.Event()
+        self.task = None
+        self.ultimo_envio = 0.0
+
+        # Contadores
+        self.enviados = 0
+        self.mensagens = 0
+        self.descartados = 0
+        self.descartados_pendentes = 0 # Ainda não avisados no canal
+        self.falhas = 0
+
+    @property
+    def profundidade(self):
+        return len(self.importantes) + len(self.baixas)
+
+    def stats(self):
+        return {
+            'fila': self.profundidade,
+            'enviados': self.enviados,
+            'mensagens': self.mensagens,
+            'descartados': self.descartados,
+            'falhas': self.falhas,
+        }
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Tenta enviar o que restou na fila e encerra a task."""
+        if self.task is None:
+            return
+        self.task.cancel()
+        self.task = None
+        try:
+            while self.profundidade or self.descartados_pendentes:
+                await self._enviar_lote()
+        except Exception as e:
+            print(f"Erro ao esvaziar a fila de logs: {e}")
+
+    def enqueue(self, message: str, color, prioridade=PRIORIDADE_NORMAL):
+        """Coloca um log na fila. Nunca espera: se a fila estiver cheia, descarta logs de baixa prioridade."""
+        item = (message, color, datetime.datetime.now())
+
+        if self.profundidade >= MAX_FILA:
+            if self.baixas:
+                self.baixas.popleft()
+                self._descartar()
+            elif prioridade == PRIORIDADE_BAIXA:
+                self._descartar()
+                return
+
+        if prioridade == PRIORIDADE_BAIXA:
+            self.baixas.append(item)
+        else:
+            self.importantes.append(item)
+        self.novo_log.set()
+
+    def _descartar(self):
+        self.descartados += 1
+        self.descartados_pendentes += 1
+
+    async def _run(self):
+        await self.bot.wait_until_ready() # Logs enfileirados no setup_hook esperam o canal existir no cache
+        while True:
+            await self.novo_log.wait()
+            # Espera a rajada terminar para mandar tudo junto
+            await asyncio.sleep(JANELA_AGRUPAMENTO)
+            self.novo_log.clear()
+
+            while self.profundidade or self.descartados_pendentes:
+                espera = self.ultimo_envio + INTERVALO_MINIMO_ENVIO - time.monotonic()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                try:
+                    await self._enviar_lote()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Erro ao tentar enviar log do canal: {e}")
+
+    def _montar_lote(self):
+        """Monta até 10 embeds. Quando a fila está grande, junta vários logs de baixa prioridade em um embed só."""
+        embeds = []
+        if self.descartados_pendentes:
+            embeds.append(discord.Embed(
+                description=f"⚠️ **{self.descartados_pendentes}** logs de apostas foram omitidos (fila de logs cheia).",
+                color=discord.Color.dark_grey(), timestamp=datetime.datetime.now()
+            ))
+            self.descartados_pendentes = 0
+
+        while self.importantes and len(embeds) < MAX_EMBEDS_POR_MENSAGEM:
+            message, color, timestamp = self.importantes.popleft()
+            embeds.append(discord.Embed(description=message, color=color, timestamp=timestamp))
+
+        agrupar = len(self.baixas) > MAX_EMBEDS_POR_MENSAGEM - len(embeds)
+        while self.baixas and len(embeds) < MAX_EMBEDS_POR_MENSAGEM:
+            message, color, timestamp = self.baixas.popleft()
+            if agrupar:
+                linhas = [message]
+                tamanho = len(message)
+                while self.baixas and tamanho + len(self.baixas[0][0]) + 1 <= MAX_DESCRICAO_EMBED:
+                    proxima = self.baixas.popleft()[0]
+                    linhas.append(proxima)
+                    tamanho += len(proxima) + 1
+                message = "\n".join(linhas)
+                color = discord.Color.greyple()
+            embeds.append(discord.Embed(description=message, color=color, timestamp=timestamp))
+        return embeds
+
+    async def _enviar_lote(self):
+        embeds = self._montar_lote()
+        if not embeds:
+            return
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            return
+        self.ultimo_envio = time.monotonic()
+        try:
+            await channel.send(embeds=embeds)
+        except discord.HTTPException:
+            self.falhas += 1
+            raise
+        self.mensagens += 1
+        self.enviados += len(embeds)
@@ -0,0 +1,182 @@
+# loop_watchdog.py
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+import metricas
+
+# --- Vigia de Travadas do Event Loop ---
+# Uma task mede o atraso do loop o tempo todo. Uma thread auxiliar percebe quando a task parou de
+# bater (o loop está preso em código síncrono) e captura a pilha da thread do loop naquele momento,
+# junto com o comando que estava rodando. Quando o loop volta, a travada é impressa e guardada no histórico.
+
+WATCHDOG_INTERVALO = 0.1   # Segundos entre as medições de atraso
+WATCHDOG_LIMITE = 0.5      # Atraso a partir do qual conta como travada
+WATCHDOG_HISTORICO = 200   # Travadas guardadas para o resumo (as mais antigas saem)
+WATCHDOG_QUADROS = 12      # Quadros da pilha impressos por travada
+
+_PASTA = os.path.dirname(os.path.abspath(__file__))
+
+
+class Travada:
+    __slots__ = ('instante', 'duracao', 'comando', 'local', 'pilha')
+
+    def __init__(self, duracao, comando, local, pilha):
+        self.instante = time.time()
+        self.duracao = duracao
+        self.comando = comando
+        self.local = local
+        self.pilha = pilha
+
+
+def _pilha_da_task(pilha):
+    """Descarta os quadros do próprio asyncio (do asyncio.run até o callback que está rodando)."""
+    for i in range(len(pilha) - 1, -1, -1):
+        if pilha[i].filename.endswith(os.path.join("asyncio", "events.py")):
+            return pilha[i + 1:]
+    return pilha
+
+
+def _local(pilha):
+    """Quadro mais interno que pertence ao código do bot (o resto é biblioteca)."""
+    for quadro in reversed(pilha):
+        if os.path.dirname(os.path.abspath(quadro.filename)) == _PASTA:
+            return f"{os.path.basename(quadro.filename)}:{quadro.lineno} ({quadro.name})"
+    if pilha:
+        return f"{os.path.basename(pilha[-1].filename)}:{pilha[-1].lineno} ({pilha[-1].name})"
+    return "?"
+
+
+class LoopWatchdog:
+    """Mede o atraso do event loop e aponta o código que o travou."""
+    def __init__(self, limite=WATCHDOG_LIMITE, intervalo=WATCHDOG_INTERVALO):
+        self.limite = limite
+        self.intervalo = intervalo
+        self.comandos = weakref.WeakKeyDictionary() # task -> comando rodando nela (preenchido pelos hooks do bot)
+        self.travadas = collections.deque(maxlen=WATCHDOG_HISTORICO)
+        self.atrasos = collections.deque(maxlen=600) # Últimas medições (~1 minuto)
+        self.maior_atraso = 0.0
+        self.total_travadas = 0
+
+        self.task = None
+        self.loop = None
+        self.thread = None
+        self.thread_id = None
+        self.batimento = time.monotonic()
+        self._parar = threading.Event()
+        self._captura = None # (comando, pilha) capturados pela thread auxiliar
+
+    def start(self):
+        if self.task is not None and not self.task.done():
+            return
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.batimento = time.monotonic()
+        self._parar.clear()
+        self.task = asyncio.create_task(self._medir())
+        self.thread = threading.Thread(target=self._vigiar, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._parar.set()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def comando_iniciado(self, nome):
+        self.comandos[asyncio.current_task()] = nome
+
+    def comando_terminado(self):
+        self.comandos.pop(asyncio.current_task(), None)
+
+    # --- Task no event loop ---
+
+    async def _medir(self):
+        while True:
+            inicio = time.monotonic()
+            await asyncio.sleep(self.intervalo)
+            agora = time.monotonic()
+            self.batimento = agora
+            atraso = max(0.0, agora - inicio - self.intervalo)
+            self.atrasos.append(atraso)
+            self.maior_atraso = max(self.maior_atraso, atraso)
+            metricas.LOOP_ATRASO.observar(atraso)
+
+            captura, self._captura = self._captura, None
+            if atraso >= self.limite:
+                self._registrar(atraso, captura)
+
+    def _registrar(self, atraso, captura):
+        if captura is None:
+            # A thread auxiliar não conseguiu rodar durante a travada (código segurando o GIL)
+            comando, pilha = "?", []
+        else:
+            comando, pilha = captura[0], _pilha_da_task(captura[1])
+        travada = Travada(atraso, comando, _local(pilha), pilha)
+        self.travadas.append(travada)
+        self.total_travadas += 1
+        metricas.LOOP_TRAVADAS.inc(comando)
+
+        print(f"[watchdog] Event loop travado por {atraso * 1000:.0f} ms (comando: {comando}, em {travada.local})")
+        if pilha:
+            print("".join(traceback.format_list(pilha[-WATCHDOG_QUADROS:])), end="")
+
+    # --- Thread auxiliar ---
+
+    def _comando_atual(self):
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            return "?"
+        if task is None:
+            return "(callback do loop)"
+        nome = self.comandos.get(task)
+        if nome is not None:
+            return nome
+        coro = task.get_coro()
+        return f"task {getattr(coro, '__qualname__', task.get_name())}"
+
+    def _vigiar(self):
+        capturado = None # Batimento da travada já capturada (uma captura por travada)
+        while not self._parar.wait(self.intervalo / 2):
+            batimento = self.batimento
+            if time.monotonic() - batimento < self.limite or capturado == batimento:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            comando = self._comando_atual()
+            pilha = traceback.extract_stack(frame)
+            del frame
+            if self.batimento != batimento:
+                continue # O loop voltou enquanto capturávamos: a pilha já não é a da travada
+            capturado = batimento
+            self._captura = (comando, pilha)
+
+    # --- Resumo ---
+
+    def piores(self, limite=10):
+        """Agrupa as travadas recentes por (comando, local) e ordena pelo tempo total travado."""
+        grupos = {}
+        for travada in self.travadas:
+            chave = (travada.comando, travada.local)
+            grupo = grupos.setdefault(chave, [0, 0.0, 0.0])
+            grupo[0] += 1
+            grupo[1] += travada.duracao
+            grupo[2] = max(grupo[2], travada.duracao)
+        ordenados = sorted(grupos.items(), key=lambda item: -item[1][1])
+        return [(comando, local, vezes, total, pior) for (comando, local), (vezes, total, pior) in ordenados[:limite]]
+
+    def stats(self):
+        atrasos = sorted(self.atrasos)
+        p99 = atrasos[min(len(atrasos) - 1, int(len(atrasos) * 0.99))] if atrasos else 0.0
+        return {
+            'atraso_p99': p99,
+            'maior_atraso': self.maior_atraso,
+            'travadas': self.total_travadas,
+        }
@@ -8,12 +8,21 @@ import datetime
 import random
 import math
 import asyncio
+import time
 import traceback
 from datetime import timezone, timedelta 
-import sqlite3 
 
 # Importa o nosso novo arquivo de banco de dados
 import database
+from log_dispatcher import LogDispatcher, PRIORIDADE_ALTA, PRIORIDADE_NORMAL, PRIORIDADE_BAIXA
+from timers import TimerService
+from journal import GameJournal
+import metricas
+from loop_watchdog import LoopWatchdog
+from profiler import CommandProfiler, PROFILER_PADRAO, PROFILER_MAX_EXECUCOES, PROFILER_MAX_SEGUNDOS
+from constantes import (
+    HAPPY_HOUR_MULTIPLICADOR, COIN_MULTIPLICADOR, SLOT_EMOJIS, SLOTS_SIMBOLO_JACKPOT, SLOTS_DEVOLUCAO_PAR, CORES_ROLETA
+)
 
 # --- 1. Configuração Inicial ---
 print("Carregando variáveis de ambiente...")
@@ -33,22 +42,18 @@ except ValueError:
     print("ERRO CRÍTICO: ADMIN_ROLE_ID ou LOG_CHANNEL_ID no .env não são números válidos.")
     exit()
 
+# Porta local das métricas no formato do Prometheus (0 desliga)
+try:
+    METRICS_PORT = int(os.getenv("METRICS_PORT") or 9108)
+except ValueError:
+    print("AVISO: METRICS_PORT no .env não é um número válido. Métricas desligadas.")
+    METRICS_PORT = 0
+
 # --- 2. Constantes de Jogo (Apenas as simples) ---
 BASE_RECOMPENSA_DAILY = 250
 BONUS_STREAK_DAILY = 50
 BRT = timezone(timedelta(hours=-3)) # Fuso horário de Brasília (UTC-3)
 
-SLOT_EMOJIS = [
-    ("🍒", 10, 3.0), ("🍋", 10, 3.0), ("🍉", 8,  5.0),
-    ("⭐", 5,  10.0), ("💎", 3,  25.0), ("💰", 1,  0)
-]
-
-CORES_ROLETA = {
-    'vermelho': {'multi': 2, 'numeros': [1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36]},
-    'preto':    {'multi': 2, 'numeros': [2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35]},
-    'verde':    {'multi': 14, 'numeros': [0]}
-}
-
 # --- 6. Definição da Classe do Bot ---
 print("Configurando a classe do Bot...")
 
@@ -61,16 +66,60 @@ class CassinoBot(commands.Bot):
         # Gerenciadores de Estado de Jogo (O Cog vai acessá-los)
         self.active_blackjack_games = {}
         self.active_duelos = {}
-        self.current_crash_game = None
+        self.crash_manager = None # Rodadas de Crash por servidor (criado pelo Cog)
+        self.shoes = {} # Sapatos de Blackjack por servidor, mantidos entre recargas do Cog
+        self.mesas_blackjack = {} # channel_id -> BlackjackTable aberta no canal
+        self.blackjack_reaper = None # Encerra jogos de Blackjack parados (criado pelo Cog)
+
+        # Prazos de jogos, duelos e eventos (um único heap para o bot inteiro)
+        self.timers = TimerService()
+
+        # Apostas de jogos em andamento, para não sumirem se o bot cair
+        self.journal = GameJournal()
+
+        # Logs no canal (enviados em lote por uma task em segundo plano)
+        self.log_dispatcher = LogDispatcher(self, self.log_channel_id)
 
         # Funcionalidades Automáticas
         self.happy_hour = False
-        self.happy_hour_multiplier = 1.3
+        self.happy_hour_multiplier = HAPPY_HOUR_MULTIPLICADOR
+        self.happy_hour_duracao = 3600
+
+        # Aponta o código que trava o event loop (o que atrasa o heartbeat do gateway)
+        self.watchdog = LoopWatchdog()
+
+        # cProfile/tracemalloc sob demanda para um comando (-profiler)
+        self.profiler = CommandProfiler(self)
+
+        # Métricas servidas em http://127.0.0.1:METRICS_PORT/metrics
+        self.metrics_server = metricas.MetricsServer("127.0.0.1", METRICS_PORT) if METRICS_PORT else None
+        metricas.Gauge("cassino_blackjack_jogos_ativos", "Jogos de Blackjack em andamento.", lambda: len(self.active_blackjack_games))
+        metricas.Gauge("cassino_crash_jogadores", "Jogadores em rodadas de Crash.", lambda: len(self.crash_manager.jogadores) if self.crash_manager else 0)
+        metricas.Gauge("cassino_duelos_pendentes", "Duelos esperando resposta.", lambda: len(self.active_duelos))
+        metricas.Gauge("cassino_timers_pendentes", "Prazos agendados no TimerService.", lambda: len(self.timers))
+        metricas.Gauge("cassino_logs_na_fila", "Logs esperando envio para o canal.", lambda: self.log_dispatcher.stats()['fila'])
 
     async def setup_hook(self):
         """Função que roda para iniciar tasks e carregar Cogs."""
+        # Antes de conectar ao gateway: nenhum comando roda sem a configuração e o jackpot carregados
+        await database.init_db()
+        reembolsos, derrotas = await self.journal.restaurar()
+        if reembolsos or derrotas:
+            print(f"Jogos abertos restaurados: {reembolsos} apostas devolvidas, {derrotas} derrotas no Crash.")
+            await self.log_action(f"♻️ **Reinício**: {reembolsos} apostas de jogos interrompidos devolvidas, {derrotas} derrotas no Crash registradas.", discord.Color.orange(), PRIORIDADE_ALTA)
+        self.watchdog.start()
+        metricas.instrumentar_http(self.http)
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+                print(f"Métricas em http://127.0.0.1:{METRICS_PORT}/metrics")
+            except OSError as e:
+                print(f"Erro ao abrir a porta de métricas {METRICS_PORT}: {e}")
+                self.metrics_server = None
+        self.log_dispatcher.start()
         self.happy_hour_task.start()
         print("Task de Happy Hour iniciada.")
+        self.jackpot_flush_task.start()
 
         # Carrega o nosso novo arquivo de Cog
         try:
@@ -79,19 +128,47 @@ class CassinoBot(commands.Bot):
             print(f"ERRO CRÍTICO ao carregar 'jogos_complexos.py': {e}")
             traceback.print_exc()
 
+    async def get_context(self, origin, /, *, cls=discord.utils.MISSING):
+        """Marca quando a mensagem chegou, antes de cooldowns, conversores e do before_invoke (ex: o instante do -sacarcrash)."""
+        recebido_em = time.monotonic()
+        ctx = await super().get_context(origin, cls=cls)
+        ctx.recebido_em = recebido_em
+        return ctx
+
+    async def close(self):
+        """Desliga o bot e fecha as conexões persistentes do banco de dados."""
+        self.timers.stop()
+        self.watchdog.stop()
+        await self.log_dispatcher.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await super().close()
+        self.journal.close()
+        await database.close_connections()
+
     # Task para a "Happy Hour"
     @tasks.loop(hours=1)
     async def happy_hour_task(self):
         try:
             if not self.happy_hour and random.random() < 0.2:
                 self.happy_hour = True
-                await self.log_action("🎉 **HAPPY HOUR INICIADA!** 🎉\nTodos os ganhos em jogos terão **+30%** pela próxima hora!", discord.Color.gold())
-                await asyncio.sleep(3600) 
-                self.happy_hour = False
-                await self.log_action("A Happy Hour terminou.", discord.Color.greyple())
+                await self.log_action("🎉 **HAPPY HOUR INICIADA!** 🎉\nTodos os ganhos em jogos terão **+30%** pela próxima hora!", discord.Color.gold(), PRIORIDADE_ALTA)
+                self.timers.agendar(self.happy_hour_duracao, self.encerrar_happy_hour)
         except Exception as e:
             print(f"Erro na task de Happy Hour: {e}")
 
+    async def encerrar_happy_hour(self):
+        self.happy_hour = False
+        await self.log_action("A Happy Hour terminou.", discord.Color.greyple(), PRIORIDADE_ALTA)
+
+    # Task que grava o jackpot acumulado em memória
+    @tasks.loop(seconds=30)
+    async def jackpot_flush_task(self):
+        try:
+            await database.flush_jackpot()
+        except Exception as e:
+            print(f"Erro ao gravar o jackpot: {e}")
+
     @happy_hour_task.before_loop
     async def before_happy_hour_task(self):
         await self.wait_until_ready()
@@ -99,15 +176,9 @@ class CassinoBot(commands.Bot):
 
     # --- 4. Funções Auxiliares (AGORA DENTRO DO BOT) ---
 
-    async def log_action(self, message: str, color=discord.Color.greyple()):
-        """Envia uma mensagem de log para o canal definido no bot."""
-        try:
-            channel = self.get_channel(self.log_channel_id)
-            if channel:
-                embed = discord.Embed(description=message, color=color, timestamp=datetime.datetime.now())
-                await channel.send(embed=embed)
-        except Exception as e:
-            print(f"Erro ao tentar enviar log do canal: {e}")
+    async def log_action(self, message: str, color=discord.Color.greyple(), prioridade=PRIORIDADE_NORMAL):
+        """Coloca uma mensagem de log na fila do canal de logs (enviada em lote em segundo plano)."""
+        self.log_dispatcher.enqueue(message, color, prioridade)
 
     def parse_amount(self, amount_str: str, max_val: int = None) -> int | str:
         """Converte a entrada de <valor> (ex: "100k", "5b", "all") em um número inteiro."""
@@ -142,8 +213,8 @@ class CassinoBot(commands.Bot):
     async def verificar_e_processar_aposta(self, ctx, autor, valor_str):
         """Função auxiliar para validar uma aposta."""
         await database.check_user(autor.id) # Usa a função do database.py
-        balance = database.get_balance(autor.id)
-        max_aposta = int(database.get_config('max_aposta'))
+        balance = await database.get_balance(autor.id)
+        max_aposta = database.get_config('max_aposta')
 
         amount = self.parse_amount(valor_str, max_val=balance['carteira'])
 
@@ -178,12 +249,59 @@ async def on_ready():
     """Disparado quando o bot conecta."""
     print(f'Bot conectado como {bot.user}')
     print(f'Prefixo: {bot.command_prefix}')
-    database.init_db() # Chama a função do database.py
+    for guild in bot.guilds:
+        await sincronizar_membros(guild)
     await bot.change_presence(activity=discord.Game(name="-ajuda | Faça sua aposta!"))
 
+async def sincronizar_membros(guild):
+    """Grava quais jogadores do cassino estão no servidor (base do ranking por servidor)."""
+    await database.sync_guild_members(guild.id, [m.id for m in guild.members if not m.bot and database.is_player(m.id)])
+
+@bot.event
+async def on_guild_join(guild):
+    await sincronizar_membros(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    await database.sync_guild_members(guild.id, [])
+
+@bot.event
+async def on_member_join(member):
+    if not member.bot and database.is_player(member.id):
+        await database.add_guild_member(member.guild.id, member.id)
+
+@bot.event
+async def on_member_remove(member):
+    await database.remove_guild_member(member.guild.id, member.id)
+
+@bot.before_invoke
+async def antes_do_comando(ctx):
+    """Marca o início do comando (métricas e watchdog) e mantém o jogador no ranking do servidor onde ele jogou."""
+    ctx.inicio_metricas = time.perf_counter()
+    bot.watchdog.comando_iniciado(ctx.command.qualified_name)
+    if ctx.guild is not None and not ctx.author.bot:
+        await database.add_guild_member(ctx.guild.id, ctx.author.id)
+    if bot.profiler.sessao is not None:
+        bot.profiler.antes(ctx)
+
+@bot.after_invoke
+async def depois_do_comando(ctx):
+    """Registra a duração do comando no histograma (roda mesmo se o comando der erro)."""
+    bot.watchdog.comando_terminado()
+    inicio = getattr(ctx, 'inicio_metricas', None)
+    if inicio is not None:
+        resultado = "erro" if ctx.command_failed else "ok"
+        metricas.COMANDO_DURACAO.observar(time.perf_counter() - inicio, ctx.command.qualified_name, resultado)
+    if bot.profiler.sessao is not None:
+        await bot.profiler.depois(ctx)
+
 @bot.event
 async def on_command_error(ctx, error):
     """Gerenciador de erros global."""
+    if ctx.command is not None:
+        original = getattr(error, 'original', error)
+        metricas.COMANDO_ERROS.inc(ctx.command.qualified_name, type(original).__name__)
+
     if isinstance(error, commands.CommandNotFound):
         pass
     elif isinstance(error, commands.MissingRequiredArgument):
@@ -216,11 +334,11 @@ print("Configurando comandos de Economia...")
 async def saldo(ctx, member: discord.Member = None):
     target_user = member or ctx.author
     await database.check_user(target_user.id)
-    balance = database.get_balance(target_user.id)
+    balance = await database.get_balance(target_user.id)
     if balance:
         total = balance['carteira'] + balance['banco']
         embed = discord.Embed(title=f"💰 Saldo de {target_user.display_name}", color=discord.Color.gold())
-        embed.set_thumbnail(url=target_user.avatar.url if target_user.avatar else discord.Embed.Empty)
+        embed.set_thumbnail(url=target_user.avatar.url if target_user.avatar else None)
         embed.add_field(name="Carteira", value=f"$ {balance['carteira']:,}", inline=True)
         embed.add_field(name="Banco", value=f"$ {balance['banco']:,}", inline=True)
         embed.add_field(name="Total", value=f"$ {total:,}", inline=False)
@@ -236,20 +354,20 @@ async def banco(ctx):
 async def depositar(ctx, *, valor: str):
     author_id = ctx.author.id
     await database.check_user(author_id)
-    balance = database.get_balance(author_id)
+    balance = await database.get_balance(author_id)
     amount = bot.parse_amount(valor, max_val=balance['carteira'])
     if isinstance(amount, str): return await ctx.send(amount)
     if amount > balance['carteira']: return await ctx.send("Você não tem esse dinheiro na carteira.")
 
-    new_carteira = balance['carteira'] - amount
-    new_banco = balance['banco'] + amount
-    database.update_balance(author_id, new_carteira, new_banco)
+    new_balance = await database.add_balance(author_id, carteira_delta=-amount, banco_delta=amount)
+    if new_balance is None: return await ctx.send("Você não tem esse dinheiro na carteira.")
+    new_carteira, new_banco = new_balance['carteira'], new_balance['banco']
 
     embed = discord.Embed(title="🏦 Depósito Realizado", description=f"Você depositou **$ {amount:,}** no banco.", color=discord.Color.green())
     embed.add_field(name="Nova Carteira", value=f"$ {new_carteira:,}", inline=True)
     embed.add_field(name="Novo Saldo no Banco", value=f"$ {new_banco:,}", inline=True)
     await ctx.send(embed=embed)
-    await bot.log_action(f"**Depósito**: {ctx.author.mention} depositou `$ {amount:,}`.", discord.Color.green())
+    await bot.log_action(f"**Depósito**: {ctx.author.mention} depositou `$ {amount:,}`.", discord.Color.green(), PRIORIDADE_BAIXA)
     await database.db_log(author_id, "DEPOSITO", f"Valor: {amount}")
 
 @bot.command(name='sacar', aliases=['withdraw'])
@@ -257,20 +375,20 @@ async def depositar(ctx, *, valor: str):
 async def sacar(ctx, *, valor: str):
     author_id = ctx.author.id
     await database.check_user(author_id)
-    balance = database.get_balance(author_id)
+    balance = await database.get_balance(author_id)
     amount = bot.parse_amount(valor, max_val=balance['banco'])
     if isinstance(amount, str): return await ctx.send(amount)
     if amount > balance['banco']: return await ctx.send("Você não tem esse dinheiro no banco.")
 
-    new_carteira = balance['carteira'] + amount
-    new_banco = balance['banco'] - amount
-    database.update_balance(author_id, new_carteira, new_banco)
+    new_balance = await database.add_balance(author_id, carteira_delta=amount, banco_delta=-amount)
+    if new_balance is None: return await ctx.send("Você não tem esse dinheiro no banco.")
+    new_carteira, new_banco = new_balance['carteira'], new_balance['banco']
 
     embed = discord.Embed(title="💸 Saque Realizado", description=f"Você sacou **$ {amount:,}** do banco.", color=discord.Color.orange())
     embed.add_field(name="Nova Carteira", value=f"$ {new_carteira:,}", inline=True)
     embed.add_field(name="Novo Saldo no Banco", value=f"$ {new_banco:,}", inline=True)
     await ctx.send(embed=embed)
-    await bot.log_action(f"**Saque**: {ctx.author.mention} sacou `$ {amount:,}`.", discord.Color.orange())
+    await bot.log_action(f"**Saque**: {ctx.author.mention} sacou `$ {amount:,}`.", discord.Color.orange(), PRIORIDADE_BAIXA)
     await database.db_log(author_id, "SAQUE", f"Valor: {amount}")
 
 @bot.command(name='pagar', aliases=['pay'])
@@ -283,17 +401,13 @@ async def pagar(ctx, member: discord.Member, *, valor: str):
 
     await database.check_user(author.id)
     await database.check_user(target.id)
-    author_balance = database.get_balance(author.id)
+    author_balance = await database.get_balance(author.id)
     amount = bot.parse_amount(valor, max_val=author_balance['carteira'])
     if isinstance(amount, str): return await ctx.send(amount)
     if amount > author_balance['carteira']: return await ctx.send("Você não tem dinheiro suficiente na carteira.")
 
-    target_balance = database.get_balance(target.id)
-    new_author_carteira = author_balance['carteira'] - amount
-    new_target_carteira = target_balance['carteira'] + amount
-
-    database.update_balance(author.id, new_author_carteira, author_balance['banco'])
-    database.update_balance(target.id, new_target_carteira, target_balance['banco'])
+    if await database.transfer(author.id, target.id, amount) is None:
+        return await ctx.send("Você não tem dinheiro suficiente na carteira.")
 
     embed = discord.Embed(title="💸 Pagamento Realizado", description=f"Você pagou **$ {amount:,}** para {target.mention}.", color=discord.Color.blue())
     embed.set_footer(text=f"{author.display_name} -> {target.display_name}")
@@ -308,10 +422,7 @@ async def daily(ctx):
     author_id = ctx.author.id
     await database.check_user(author_id)
 
-    conn = sqlite3.connect(database.DB_NAME) 
-    cursor = conn.cursor()
-    cursor.execute("SELECT last_daily, daily_streak, carteira, banco FROM usuarios WHERE user_id = ?", (author_id,))
-    data = cursor.fetchone()
+    data = await database.get_daily(author_id)
     last_daily_str, streak, carteira, banco = data
 
     try:
@@ -334,7 +445,6 @@ async def daily(ctx):
         horas, rem = divmod(tempo_restante.seconds, 3600)
         minutos, _ = divmod(rem, 60)
         await ctx.send(f"Você já coletou seu daily hoje! Tente novamente em **{horas}h {minutos}m** (às 00:00 no horário de Brasília).")
-        conn.close()
         return
 
     ontem_brt = today_brt - timedelta(days=1)
@@ -344,13 +454,12 @@ async def daily(ctx):
         streak = 1
 
     recompensa_total = BASE_RECOMPENSA_DAILY + (streak * BONUS_STREAK_DAILY)
-    nova_carteira = carteira + recompensa_total
 
     now_utc_iso = datetime.datetime.now(timezone.utc).isoformat()
 
-    cursor.execute("UPDATE usuarios SET carteira = ?, daily_streak = ?, last_daily = ? WHERE user_id = ?", (nova_carteira, streak, now_utc_iso, author_id))
-    conn.commit()
-    conn.close()
+    nova_carteira = await database.claim_daily(author_id, recompensa_total, streak, last_daily_str, now_utc_iso)
+    if nova_carteira is None:
+        return await ctx.send("Você já coletou seu daily hoje!")
 
     embed = discord.Embed(title="🌟 Recompensa Diária", description=f"Você coletou sua recompensa diária de **$ {recompensa_total:,}**!", color=discord.Color.brand_green())
     embed.add_field(name="Novo Saldo (Carteira)", value=f"$ {nova_carteira:,}", inline=True)
@@ -376,48 +485,44 @@ async def coin(ctx, lado: str, *, valor: str):
     if not aposta_valida: return
 
     author_id = ctx.author.id
-    balance = database.get_balance(author_id)
-    taxa = float(database.get_config('taxa_casa'))
-    multiplicador = 2.0
+    taxa = database.get_config('taxa_casa')
+    multiplicador = COIN_MULTIPLICADOR
 
     if bot.happy_hour:
         multiplicador *= bot.happy_hour_multiplier
 
     resultado = random.choice(['cara', 'coroa'])
+    venceu = lado_escolhido == resultado
+    ganhos = math.floor(amount * multiplicador * (1 - taxa)) if venceu else 0
+    lucro = ganhos - amount
+
+    # Liquida a aposta de uma vez (debita a aposta e credita os ganhos no mesmo UPDATE)
+    balance = await database.settle_bet(author_id, amount, ganhos, vitorias_add=int(venceu), derrotas_add=int(not venceu))
+    if balance is None:
+        return await ctx.send("Você não tem mais todo esse dinheiro na carteira para apostar.")
 
     embed = discord.Embed(title="🪙 Cara ou Coroa", description=f"Você apostou **$ {amount:,}** em **{lado_escolhido.capitalize()}**.\nA moeda está girando...", color=discord.Color.light_grey())
     msg = await ctx.send(embed=embed)
     await asyncio.sleep(1.5) 
 
-    lucro = 0
-    if lado_escolhido == resultado:
-        multiplicador_real = multiplicador * (1 - taxa)
-        ganhos = math.floor(amount * multiplicador_real)
-        lucro = ganhos - amount
-        nova_carteira = balance['carteira'] + ganhos
-
+    if venceu:
         embed.description = f"Deu **{resultado.capitalize()}**! Você ganhou **$ {ganhos:,}** (Lucro: $ {lucro:,})!"
         if bot.happy_hour:
              embed.description += " (Bônus Happy Hour!)"
         embed.color = discord.Color.green()
 
-        await database.update_stats(author_id, vitorias_add=1)
         log_msg = f"**Coinflip (Vitória)**: {ctx.author.mention} apostou `$ {amount:,}` e lucrou `$ {lucro:,}`."
         log_color = discord.Color.green()
     else:
-        nova_carteira = balance['carteira'] - amount
-        lucro = -amount
         embed.description = f"Deu **{resultado.capitalize()}**... Você perdeu **$ {amount:,}**."
         embed.color = discord.Color.red()
 
-        await database.update_stats(author_id, derrotas_add=1)
         log_msg = f"**Coinflip (Derrota)**: {ctx.author.mention} apostou e perdeu `$ {amount:,}`."
         log_color = discord.Color.red()
 
-    database.update_balance(author_id, nova_carteira, balance['banco'])
-    embed.add_field(name="Nova Carteira", value=f"$ {nova_carteira:,}")
+    embed.add_field(name="Nova Carteira", value=f"$ {balance['carteira']:,}")
     await msg.edit(embed=embed)
-    await bot.log_action(log_msg, log_color)
+    await bot.log_action(log_msg, log_color, PRIORIDADE_BAIXA)
     await database.db_log(author_id, "COINFLIP", f"Aposta: {amount}, Lucro: {lucro}, Resultado: {resultado}")
 
 @bot.command(name='dice', aliases=['dado'])
@@ -430,8 +535,7 @@ async def dice(ctx, numero_escolhido: int, *, valor: str):
     if not aposta_valida: return
 
     author_id = ctx.author.id
-    balance = database.get_balance(author_id)
-    taxa = float(database.get_config('taxa_casa'))
+    taxa = database.get_config('taxa_casa')
 
     chance_vitoria = (100 - numero_escolhido) / 100.0
     multiplicador = (1 / chance_vitoria)
@@ -441,6 +545,13 @@ async def dice(ctx, numero_escolhido: int, *, valor: str):
 
     multiplicador_real = multiplicador * (1 - taxa)
     dado = random.randint(1, 100)
+    venceu = dado > numero_escolhido
+    ganhos = math.floor(amount * multiplicador_real) if venceu else 0
+    lucro = ganhos - amount
+
+    balance = await database.settle_bet(author_id, amount, ganhos, vitorias_add=int(venceu), derrotas_add=int(not venceu))
+    if balance is None:
+        return await ctx.send("Você não tem mais todo esse dinheiro na carteira para apostar.")
 
     embed = discord.Embed(title="🎲 Jogo do Dado", description=f"Você apostou **$ {amount:,}** que o dado cairia **acima de {numero_escolhido}**.", color=discord.Color.dark_orange())
     embed.add_field(name="Seu Número", value=f"> {numero_escolhido}", inline=True)
@@ -450,33 +561,24 @@ async def dice(ctx, numero_escolhido: int, *, valor: str):
 
     embed.add_field(name="Resultado do Dado", value=f"**{dado}**", inline=False)
 
-    lucro = 0
-    if dado > numero_escolhido:
-        ganhos = math.floor(amount * multiplicador_real)
-        lucro = ganhos - amount
-        nova_carteira = balance['carteira'] + ganhos
+    if venceu:
         embed.description = f"O dado caiu em **{dado}**! Você ganhou **$ {ganhos:,}** (Lucro: $ {lucro:,})!"
         if bot.happy_hour:
              embed.description += " (Bônus Happy Hour!)"
         embed.color = discord.Color.green()
 
-        await database.update_stats(author_id, vitorias_add=1)
         log_msg = f"**Dice (Vitória)**: {ctx.author.mention} apostou `$ {amount:,}` (> {numero_escolhido}) e lucrou `$ {lucro:,}`."
         log_color = discord.Color.green()
     else:
-        nova_carteira = balance['carteira'] - amount
-        lucro = -amount
         embed.description = f"O dado caiu em **{dado}**... Você perdeu **$ {amount:,}**."
         embed.color = discord.Color.red()
 
-        await database.update_stats(author_id, derrotas_add=1)
         log_msg = f"**Dice (Derrota)**: {ctx.author.mention} apostou `$ {amount:,}` (> {numero_escolhido}) e perdeu."
         log_color = discord.Color.red()
 
-    database.update_balance(author_id, nova_carteira, balance['banco'])
-    embed.add_field(name="Nova Carteira", value=f"$ {nova_carteira:,}", inline=False)
+    embed.add_field(name="Nova Carteira", value=f"$ {balance['carteira']:,}", inline=False)
     await msg.edit(embed=embed)
-    await bot.log_action(log_msg, log_color)
+    await bot.log_action(log_msg, log_color, PRIORIDADE_BAIXA)
     await database.db_log(author_id, "DICE", f"Aposta: {amount}, Acima de: {numero_escolhido}, Lucro: {lucro}, Resultado: {dado}")
 
 @bot.command(name='roleta', aliases=['roulette'])
@@ -490,8 +592,7 @@ async def roleta(ctx, cor: str, *, valor: str):
     if not aposta_valida: return
 
     author_id = ctx.author.id
-    balance = database.get_balance(author_id)
-    taxa = float(database.get_config('taxa_casa'))
+    taxa = database.get_config('taxa_casa')
 
     numero_sorteado = random.randint(0, 36)
     cor_sorteada = ""
@@ -502,43 +603,43 @@ async def roleta(ctx, cor: str, *, valor: str):
 
     emoji_cor = {'vermelho': '🟥', 'preto': '⬛', 'verde': '🟩'}.get(cor_sorteada)
 
-    embed = discord.Embed(title="🎰 Roleta", description=f"Você apostou **$ {amount:,}** no **{cor_escolhida.capitalize()}**.\nA roleta está girando...", color=discord.Color.dark_purple())
-    msg = await ctx.send(embed=embed)
-    await asyncio.sleep(2.0)
-
-    lucro = 0
-    if cor_escolhida == cor_sorteada:
+    venceu = cor_escolhida == cor_sorteada
+    ganhos = 0
+    if venceu:
         multiplicador = CORES_ROLETA[cor_sorteada]['multi']
         if bot.happy_hour:
             multiplicador *= bot.happy_hour_multiplier
 
         multiplicador_real = multiplicador * (1 - taxa)
         ganhos = math.floor(amount * multiplicador_real)
-        lucro = ganhos - amount
-        nova_carteira = balance['carteira'] + ganhos
+    lucro = ganhos - amount
 
+    balance = await database.settle_bet(author_id, amount, ganhos, vitorias_add=int(venceu), derrotas_add=int(not venceu))
+    if balance is None:
+        return await ctx.send("Você não tem mais todo esse dinheiro na carteira para apostar.")
+
+    embed = discord.Embed(title="🎰 Roleta", description=f"Você apostou **$ {amount:,}** no **{cor_escolhida.capitalize()}**.\nA roleta está girando...", color=discord.Color.dark_purple())
+    msg = await ctx.send(embed=embed)
+    await asyncio.sleep(2.0)
+
+    if venceu:
         embed.description = f"A bola caiu no **{numero_sorteado} {emoji_cor} {cor_sorteada.capitalize()}**!\nVocê ganhou **$ {ganhos:,}** (Lucro: $ {lucro:,})!"
         if bot.happy_hour:
              embed.description += " (Bônus Happy Hour!)"
         embed.color = discord.Color.green()
 
-        await database.update_stats(author_id, vitorias_add=1)
         log_msg = f"**Roleta (Vitória)**: {ctx.author.mention} apostou `$ {amount:,}` no {cor_escolhida} e lucrou `$ {lucro:,}`."
         log_color = discord.Color.green()
     else:
-        nova_carteira = balance['carteira'] - amount
-        lucro = -amount
         embed.description = f"A bola caiu no **{numero_sorteado} {emoji_cor} {cor_sorteada.capitalize()}**...\nVocê perdeu **$ {amount:,}**."
         embed.color = discord.Color.red()
 
-        await database.update_stats(author_id, derrotas_add=1)
         log_msg = f"**Roleta (Derrota)**: {ctx.author.mention} apostou `$ {amount:,}` no {cor_escolhida} e perdeu."
         log_color = discord.Color.red()
 
-    database.update_balance(author_id, nova_carteira, balance['banco'])
-    embed.add_field(name="Nova Carteira", value=f"$ {nova_carteira:,}")
+    embed.add_field(name="Nova Carteira", value=f"$ {balance['carteira']:,}")
     await msg.edit(embed=embed)
-    await bot.log_action(log_msg, log_color)
+    await bot.log_action(log_msg, log_color, PRIORIDADE_BAIXA)
     await database.db_log(author_id, "ROLETA", f"Aposta: {amount}, Cor: {cor_escolhida}, Lucro: {lucro}, Resultado: {numero_sorteado} {cor_sorteada}")
 
 @bot.command(name='slots')
@@ -548,42 +649,31 @@ async def slots(ctx, *, valor: str):
     if not aposta_valida: return
 
     author_id = ctx.author.id
-    balance = database.get_balance(author_id)
-    taxa = float(database.get_config('taxa_casa'))
-    taxa_jackpot = float(database.get_config('taxa_jackpot'))
-    jackpot_atual = int(database.get_config('jackpot'))
+    taxa = database.get_config('taxa_casa')
+    taxa_jackpot = database.get_config('taxa_jackpot')
 
+    # Contribuição em memória (gravada no banco periodicamente pela jackpot_flush_task)
     contribuicao_jackpot = math.floor(amount * taxa_jackpot)
-    novo_jackpot = jackpot_atual + contribuicao_jackpot
-    database.update_config('jackpot', str(novo_jackpot))
+    novo_jackpot = database.contribuir_jackpot(contribuicao_jackpot)
 
     emojis = [e[0] for e in SLOT_EMOJIS]
     pesos = [e[1] for e in SLOT_EMOJIS]
     colunas = random.choices(emojis, weights=pesos, k=3) 
+    log_prioridade = PRIORIDADE_BAIXA
 
-    embed = discord.Embed(title="🎰 Caça-Níquel", description=f"Você apostou **$ {amount:,}**.\nGirando...", color=discord.Color.dark_gold())
-    embed.add_field(name="Jackpot Atual", value=f"💰 $ {novo_jackpot:,}")
-    embed.add_field(name="Resultado", value=f"```\n[ ? | ? | ? ]\n```", inline=False)
-    msg = await ctx.send(embed=embed)
-    await asyncio.sleep(1.5)
-
-    resultado_str = f"```\n[ {colunas[0]} | {colunas[1]} | {colunas[2]} ]\n```"
-    embed.set_field_at(1, name="Resultado", value=resultado_str, inline=False)
-
-    lucro = 0
     if colunas[0] == colunas[1] == colunas[2]:
         simbolo_ganhador = colunas[0]
-        if simbolo_ganhador == "💰":
-            ganhos = jackpot_atual
+        if simbolo_ganhador == SLOTS_SIMBOLO_JACKPOT:
+            # O jackpot é pago por cima da aposta (o jogador não perde o valor apostado)
+            ganhos = database.resgatar_jackpot()
             lucro = ganhos
-            nova_carteira = balance['carteira'] + ganhos
+            balance = await database.settle_jackpot(author_id, amount, ganhos)
 
-            embed.description = f"🌟 **J A C K P O T** 🌟\nVocê ganhou o jackpot de **$ {ganhos:,}**!"
-            embed.color = discord.Color.gold()
-            database.update_config('jackpot', '100000')
-            await database.update_stats(author_id, vitorias_add=1)
+            descricao = f"🌟 **J A C K P O T** 🌟\nVocê ganhou o jackpot de **$ {ganhos:,}**!"
+            cor = discord.Color.gold()
             log_msg = f"**SLOTS (JACKPOT!)**: {ctx.author.mention} apostou `$ {amount:,}` e ganhou o jackpot de `$ {ganhos:,}`!"
             log_color = discord.Color.gold()
+            log_prioridade = PRIORIDADE_ALTA
         else:
             multiplicador = 0
             for e in SLOT_EMOJIS:
@@ -595,39 +685,49 @@ async def slots(ctx, *, valor: str):
             multiplicador_real = multiplicador * (1 - taxa)
             ganhos = math.floor(amount * multiplicador_real)
             lucro = ganhos - amount
-            nova_carteira = balance['carteira'] + ganhos
+            balance = await database.settle_bet(author_id, amount, ganhos, vitorias_add=1)
 
-            embed.description = f"**Três iguais!** {simbolo_ganhador} {simbolo_ganhador} {simbolo_ganhador}\nVocê ganhou **$ {ganhos:,}** (Lucro: $ {lucro:,})!"
+            descricao = f"**Três iguais!** {simbolo_ganhador} {simbolo_ganhador} {simbolo_ganhador}\nVocê ganhou **$ {ganhos:,}** (Lucro: $ {lucro:,})!"
             if bot.happy_hour:
-                 embed.description += " (Bônus Happy Hour!)"
-            embed.color = discord.Color.green()
-            await database.update_stats(author_id, vitorias_add=1)
+                 descricao += " (Bônus Happy Hour!)"
+            cor = discord.Color.green()
             log_msg = f"**Slots (Vitória)**: {ctx.author.mention} apostou `$ {amount:,}` e lucrou `$ {lucro:,}`."
             log_color = discord.Color.green()
 
     elif colunas[0] == colunas[1] or colunas[1] == colunas[2] or colunas[0] == colunas[2]:
-        ganhos = math.floor(amount * 0.5)
+        ganhos = math.floor(amount * SLOTS_DEVOLUCAO_PAR)
         lucro = ganhos - amount
-        nova_carteira = balance['carteira'] + ganhos
-        embed.description = f"**Dois iguais!** Você recebe metade da aposta de volta. Perdeu **$ {-lucro:,}**."
-        embed.color = discord.Color.light_grey()
-        await database.update_stats(author_id, derrotas_add=1)
+        balance = await database.settle_bet(author_id, amount, ganhos, derrotas_add=1)
+        descricao = f"**Dois iguais!** Você recebe metade da aposta de volta. Perdeu **$ {-lucro:,}**."
+        cor = discord.Color.light_grey()
         log_msg = f"**Slots (Parcial)**: {ctx.author.mention} apostou `$ {amount:,}` e perdeu `$ {-lucro:,}`."
         log_color = discord.Color.greyple()
 
     else:
-        nova_carteira = balance['carteira'] - amount
         lucro = -amount
-        embed.description = f"**Sem sorte!** Você perdeu **$ {amount:,}**."
-        embed.color = discord.Color.red()
-        await database.update_stats(author_id, derrotas_add=1)
+        balance = await database.settle_bet(author_id, amount, 0, derrotas_add=1)
+        descricao = f"**Sem sorte!** Você perdeu **$ {amount:,}**."
+        cor = discord.Color.red()
         log_msg = f"**Slots (Derrota)**: {ctx.author.mention} apostou e perdeu `$ {amount:,}`."
         log_color = discord.Color.red()
 
-    database.update_balance(author_id, nova_carteira, balance['banco'])
-    embed.add_field(name="Nova Carteira", value=f"$ {nova_carteira:,}", inline=False)
+    if balance is None:
+        return await ctx.send("Você não tem mais todo esse dinheiro na carteira para apostar.")
+
+    embed = discord.Embed(title="🎰 Caça-Níquel", description=f"Você apostou **$ {amount:,}**.\nGirando...", color=discord.Color.dark_gold())
+    embed.add_field(name="Jackpot Atual", value=f"💰 $ {novo_jackpot:,}")
+    embed.add_field(name="Resultado", value=f"```\n[ ? | ? | ? ]\n```", inline=False)
+    msg = await ctx.send(embed=embed)
+    await asyncio.sleep(1.5)
+
+    resultado_str = f"```\n[ {colunas[0]} | {colunas[1]} | {colunas[2]} ]\n```"
+    embed.set_field_at(1, name="Resultado", value=resultado_str, inline=False)
+    embed.description = descricao
+    embed.color = cor
+
+    embed.add_field(name="Nova Carteira", value=f"$ {balance['carteira']:,}", inline=False)
     await msg.edit(embed=embed)
-    await bot.log_action(log_msg, log_color)
+    await bot.log_action(log_msg, log_color, log_prioridade)
     await database.db_log(author_id, "SLOTS", f"Aposta: {amount}, Lucro: {lucro}, Resultado: {' '.join(colunas)}")
 
 # --- (Comandos de Jogos Complexos movidos para jogos_complexos.py) ---
@@ -656,19 +756,12 @@ async def perfil(ctx, member: discord.Member = None):
 
     await database.check_user(target_user.id)
 
-    conn = sqlite3.connect(database.DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT carteira, banco, daily_streak FROM usuarios WHERE user_id = ?", (target_user.id,))
-    user_data = cursor.fetchone()
-    cursor.execute("SELECT vitorias, derrotas FROM stats WHERE user_id = ?", (target_user.id,))
-    stats_data = cursor.fetchone()
-    conn.close()
+    profile_data = await database.get_profile(target_user.id)
 
-    if not user_data or not stats_data:
+    if not profile_data:
         return await ctx.send("Não foi possível carregar o perfil deste usuário.")
 
-    carteira, banco, streak = user_data
-    vitorias, derrotas = stats_data
+    carteira, banco, streak, vitorias, derrotas = profile_data
     total = carteira + banco
 
     if vitorias == 0 and derrotas == 0: wl_ratio = "N/A"
@@ -676,7 +769,7 @@ async def perfil(ctx, member: discord.Member = None):
     else: wl_ratio = f"{(vitorias / derrotas):.1f}"
 
     embed = discord.Embed(title=f"👤 Perfil de {target_user.display_name}", color=discord.Color.dark_teal())
-    embed.set_thumbnail(url=target_user.avatar.url if target_user.avatar else discord.Embed.Empty)
+    embed.set_thumbnail(url=target_user.avatar.url if target_user.avatar else None)
     embed.add_field(name="💰 Saldo Total", value=f"**$ {total:,}**", inline=False)
     embed.add_field(name="Carteira", value=f"$ {carteira:,}", inline=True)
     embed.add_field(name="Banco", value=f"$ {banco:,}", inline=True)
@@ -687,11 +780,7 @@ async def perfil(ctx, member: discord.Member = None):
 @bot.command(name='rank', aliases=['top', 'leaderboard'])
 @commands.cooldown(1, 15, commands.BucketType.guild)
 async def rank(ctx):
-    conn = sqlite3.connect(database.DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT user_id, (carteira + banco) as total_money FROM usuarios ORDER BY total_money DESC LIMIT 10")
-    top_users = cursor.fetchall()
-    conn.close()
+    top_users = await database.get_guild_top_users(ctx.guild.id, 10)
 
     embed = discord.Embed(title="🏆 Ranking dos Mais Ricos 🏆", description="Top 10 jogadores com mais dinheiro (carteira + banco).", color=discord.Color.gold())
 
@@ -703,14 +792,16 @@ async def rank(ctx):
     rank_count = 1
     for user_id, total_money in top_users:
         member = ctx.guild.get_member(user_id)
-        if member:
-            rank_string += f"**{rank_count}.** {member.display_name} - **$ {total_money:,}**\n"
-            rank_count += 1
-
-    if not rank_string:
-        embed.description = "Nenhum jogador do ranking está neste servidor."
+        nome = member.display_name if member else f"<@{user_id}>"
+        rank_string += f"**{rank_count}.** {nome} - **$ {total_money:,}**\n"
+        rank_count += 1
 
     embed.add_field(name="Placar", value=rank_string)
+
+    posicao = await database.get_guild_rank_position(ctx.guild.id, ctx.author.id)
+    posicao_global = await database.get_rank_position(ctx.author.id)
+    if posicao and posicao_global:
+        embed.set_footer(text=f"Sua posição: #{posicao:,} neste servidor • #{posicao_global:,} no global")
     await ctx.send(embed=embed)
 
 # --- 12. Comandos de Administração ---
@@ -722,17 +813,15 @@ async def addmoney(ctx, member: discord.Member, *, valor: str):
     if member.bot: return
     target_id = member.id
     await database.check_user(target_id)
-    balance = database.get_balance(target_id)
     amount = bot.parse_amount(valor)
     if isinstance(amount, str): return await ctx.send(amount)
 
-    new_carteira = balance['carteira'] + amount
-    database.update_balance(target_id, new_carteira, balance['banco'])
+    new_carteira = (await database.add_balance(target_id, carteira_delta=amount))['carteira']
 
     embed = discord.Embed(title="💸 Dinheiro Adicionado (Admin)", description=f"**$ {amount:,}** foram adicionados à carteira de {member.mention}.", color=discord.Color.blurple())
     embed.add_field(name="Novo Saldo (Carteira)", value=f"$ {new_carteira:,}")
     await ctx.send(embed=embed)
-    await bot.log_action(f"**Admin (add)**: {ctx.author.mention} adicionou `$ {amount:,}` para {member.mention}.", discord.Color.red())
+    await bot.log_action(f"**Admin (add)**: {ctx.author.mention} adicionou `$ {amount:,}` para {member.mention}.", discord.Color.red(), PRIORIDADE_ALTA)
     await database.db_log(ctx.author.id, "ADDMONEY", f"Valor: {amount}, Para: {target_id}")
 
 @bot.command(name='removemoney')
@@ -741,19 +830,20 @@ async def removemoney(ctx, member: discord.Member, *, valor: str):
     if member.bot: return
     target_id = member.id
     await database.check_user(target_id)
-    balance = database.get_balance(target_id)
+    balance = await database.get_balance(target_id)
     amount = bot.parse_amount(valor, max_val=balance['carteira']) 
     if isinstance(amount, str): return await ctx.send(amount)
 
-    nova_carteira = max(0, balance['carteira'] - amount)
-    valor_removido = balance['carteira'] - nova_carteira 
-
-    database.update_balance(target_id, nova_carteira, balance['banco'])
+    valor_removido = min(amount, balance['carteira'])
+    new_balance = await database.add_balance(target_id, carteira_delta=-valor_removido)
+    if new_balance is None:
+        return await ctx.send("O saldo do usuário mudou durante a operação. Tente novamente.")
+    nova_carteira = new_balance['carteira']
 
     embed = discord.Embed(title="🚫 Dinheiro Removido (Admin)", description=f"**$ {valor_removido:,}** foram removidos da carteira de {member.mention}.", color=discord.Color.dark_red())
     embed.add_field(name="Novo Saldo (Carteira)", value=f"$ {nova_carteira:,}")
     await ctx.send(embed=embed)
-    await bot.log_action(f"**Admin (rem)**: {ctx.author.mention} removeu `$ {valor_removido:,}` de {member.mention}.", discord.Color.red())
+    await bot.log_action(f"**Admin (rem)**: {ctx.author.mention} removeu `$ {valor_removido:,}` de {member.mention}.", discord.Color.red(), PRIORIDADE_ALTA)
     await database.db_log(ctx.author.id, "REMOVEMONEY", f"Valor: {valor_removido}, De: {target_id}")
 
 @bot.command(name='settaxa')
@@ -763,9 +853,9 @@ async def settaxa(ctx, porcentagem: float):
         return await ctx.send("A taxa deve ser uma porcentagem entre 0 e 100.")
 
     valor_db = porcentagem / 100.0
-    database.update_config('taxa_casa', str(valor_db))
+    await database.update_config('taxa_casa', valor_db)
     await ctx.send(f"✅ A taxa da casa foi definida para **{porcentagem}%**.\n(Jogadores receberão {100-porcentagem}% do prêmio justo).")
-    await bot.log_action(f"**Admin (config)**: {ctx.author.mention} alterou a taxa da casa para `{porcentagem}%`.", discord.Color.red())
+    await bot.log_action(f"**Admin (config)**: {ctx.author.mention} alterou a taxa da casa para `{porcentagem}%`.", discord.Color.red(), PRIORIDADE_ALTA)
 
 @bot.command(name='setmax')
 @bot.is_admin()
@@ -773,9 +863,9 @@ async def setmax(ctx, *, valor: str):
     amount = bot.parse_amount(valor)
     if isinstance(amount, str): return await ctx.send(amount)
 
-    database.update_config('max_aposta', str(amount))
+    await database.update_config('max_aposta', amount)
     await ctx.send(f"✅ A aposta máxima foi definida para **$ {amount:,}**.")
-    await bot.log_action(f"**Admin (config)**: {ctx.author.mention} alterou a aposta máxima para `$ {amount:,}`.", discord.Color.red())
+    await bot.log_action(f"**Admin (config)**: {ctx.author.mention} alterou a aposta máxima para `$ {amount:,}`.", discord.Color.red(), PRIORIDADE_ALTA)
 
 @bot.command(name='logs')
 @bot.is_admin()
@@ -792,8 +882,8 @@ async def logs(ctx, limit: int = 15):
     for log in logs_data:
         timestamp, user_id, action, details = log
         data_formatada = datetime.datetime.fromisoformat(timestamp).strftime("%d/%m %H:%M")
-        user = bot.get_user(user_id)
-        user_mention = user.mention if user else f"ID: {user_id}"
+        user = bot.get_user(user_id) if user_id is not None else None
+        user_mention = user.mention if user else (f"ID: {user_id}" if user_id is not None else "Vários jogadores")
         desc += f"`[{data_formatada}]` **{action}** - {user_mention} - *{details}*\n"
 
     if len(desc) > 4096:
@@ -802,6 +892,93 @@ async def logs(ctx, limit: int = 15):
     embed.description = desc
     await ctx.send(embed=embed)
 
+@bot.command(name='status')
+@bot.is_admin()
+async def status(ctx):
+    """Mostra o estado interno do bot (filas e contadores)."""
+    log_stats = bot.log_dispatcher.stats()
+
+    embed = discord.Embed(title="📟 Status do Bot", color=discord.Color.dark_grey())
+    embed.add_field(
+        name="Canal de Logs",
+        value=f"Na fila: **{log_stats['fila']}**\n"
+              f"Enviados: **{log_stats['enviados']}** em **{log_stats['mensagens']}** mensagens\n"
+              f"Descartados: **{log_stats['descartados']}**\n"
+              f"Falhas: **{log_stats['falhas']}**",
+        inline=False
+    )
+    if bot.blackjack_reaper:
+        bj_stats = bot.blackjack_reaper.stats()
+        embed.add_field(
+            name="Blackjack",
+            value=f"Jogos ativos: **{bj_stats['vivos']}**\n"
+                  f"Encerrados por inatividade: **{bj_stats['auto_stand']}**\n"
+                  f"Reembolsados: **{bj_stats['reembolsados']}**",
+            inline=False
+        )
+    await ctx.send(embed=embed)
+
+@bot.command(name='travadas')
+@bot.is_admin()
+async def travadas(ctx):
+    """Mostra o que mais travou o event loop recentemente (pelo watchdog)."""
+    stats = bot.watchdog.stats()
+    piores = bot.watchdog.piores()
+
+    embed = discord.Embed(title="🐢 Travadas do Event Loop", color=discord.Color.dark_grey())
+    embed.description = (
+        f"Atraso p99 (último minuto): **{stats['atraso_p99'] * 1000:.0f} ms**\n"
+        f"Maior atraso: **{stats['maior_atraso'] * 1000:.0f} ms**\n"
+        f"Travadas acima de {bot.watchdog.limite * 1000:.0f} ms: **{stats['travadas']}**\n\n"
+    )
+    if not piores:
+        embed.description += "Nenhuma travada registrada."
+    for comando, local, vezes, total, pior in piores:
+        embed.add_field(
+            name=f"{comando} — {local}"[:256],
+            value=f"{vezes}x, total **{total * 1000:,.0f} ms**, pior **{pior * 1000:,.0f} ms**",
+            inline=False
+        )
+    await ctx.send(embed=embed)
+
+@bot.command(name='profiler')
+@bot.is_admin()
+async def profiler(ctx, comando: str, limite: str = None):
+    """Liga o cProfile e o tracemalloc para as próximas N execuções de um comando (ou por um tempo, ex: 30s, 5m)."""
+    if comando.lower() == 'parar':
+        if bot.profiler.sessao is None:
+            return await ctx.send("Nenhum profiling em andamento.")
+        return await bot.profiler.encerrar()
+
+    if bot.profiler.sessao is not None:
+        return await ctx.send(f"Já existe um profiling de `{bot.profiler.sessao.comando}` em andamento. Use `{ctx.prefix}profiler parar` antes.")
+
+    alvo = bot.get_command(comando.lower())
+    if alvo is None:
+        return await ctx.send(f"Comando `{comando}` não encontrado.")
+
+    execucoes, segundos = PROFILER_PADRAO, None
+    if limite is not None:
+        limite = limite.lower()
+        try:
+            if limite[-1] in ('s', 'm'):
+                segundos = float(limite[:-1]) * (60 if limite[-1] == 'm' else 1)
+                execucoes = None
+            else:
+                execucoes = int(limite)
+        except ValueError:
+            return await ctx.send("Use um número de execuções (ex: `20`) ou um tempo (ex: `30s`, `5m`).")
+        if (execucoes is not None and not 1 <= execucoes <= PROFILER_MAX_EXECUCOES) or (segundos is not None and not 1 <= segundos <= PROFILER_MAX_SEGUNDOS):
+            return await ctx.send(f"O limite vai de 1 a {PROFILER_MAX_EXECUCOES} execuções ou de 1s a {PROFILER_MAX_SEGUNDOS // 60}m.")
+
+    bot.profiler.iniciar(alvo.qualified_name, ctx.channel, execucoes, segundos)
+    duracao = f"nas próximas **{execucoes}** execuções" if execucoes is not None else f"pelos próximos **{segundos:.0f}s**"
+    await ctx.send(
+        f"📈 Profiling de `{alvo.qualified_name}` ligado {duracao} (no máximo {PROFILER_MAX_SEGUNDOS // 60} min). "
+        f"O relatório chega aqui como arquivo; as alocações de memória são as do bot inteiro durante a sessão."
+    )
+    await bot.log_action(f"📈 **Profiler**: {ctx.author.mention} ligou o profiling de `{alvo.qualified_name}`.", discord.Color.dark_grey(), PRIORIDADE_ALTA)
+
 @bot.command(name='resetar')
 @bot.is_admin()
 async def resetar(ctx):
@@ -825,7 +1002,7 @@ async def resetar(ctx):
         await msg.edit(content="**RESETANDO ECONOMIA...**", embed=None)
         await database.reset_economy()
         await msg.edit(content="✅ **ECONOMIA RESETADA COM SUCESSO!**")
-        await bot.log_action(f"🔥🔥 **ECONOMIA GLOBAL RESETADA** por {ctx.author.mention} 🔥🔥", discord.Color.red())
+        await bot.log_action(f"🔥🔥 **ECONOMIA GLOBAL RESETADA** por {ctx.author.mention} 🔥🔥", discord.Color.red(), PRIORIDADE_ALTA)
         await database.db_log(ctx.author.id, "RESET_GLOBAL", "Economia resetada.")
 
 # --- 13. Comandos de Outros ---
@@ -875,9 +1052,10 @@ async def ajuda(ctx):
               f"`{prefixo}roleta <cor> <valor>` - Aposta no vermelho, preto ou verde.\n"
               f"`{prefixo}slots <valor>` - Gira o caça-níquel (chance de Jackpot!).\n"
               f"`{prefixo}blackjack <valor>` - Inicia um jogo de Blackjack (21).\n"
+              f"`{prefixo}mesa <valor>` - Senta em uma mesa de Blackjack com outros jogadores.\n"
               f"`{prefixo}hit` - Pede mais uma carta no Blackjack.\n"
               f"`{prefixo}stand` - Para de pedir cartas no Blackjack.\n"
-              f"`{prefixo}crash <valor>` - Entra no jogo de Crash.\n"
+              f"`{prefixo}crash <valor> [alvo]` - Entra no jogo de Crash (alvo = saque automático, ex.: 2x).\n"
               f"`{prefixo}sacarcrash` - Sai do Crash com o lucro atual.\n"
               f"`{prefixo}duelo <@usuario> <valor>` - Desafia outro jogador para um duelo.\n"
               f"`{prefixo}aceitar` - Aceita um duelo pendente.\n"
@@ -900,6 +1078,9 @@ async def ajuda(ctx):
               f"`{prefixo}settaxa <porcentagem>` - Define a taxa da casa (ex: 5 para 5%).\n"
               f"`{prefixo}setmax <valor>` - Define a aposta máxima nos jogos.\n"
               f"`{prefixo}logs [limite]` - Mostra os últimos logs do banco de dados.\n"
+              f"`{prefixo}status` - Mostra filas e contadores internos do bot.\n"
+              f"`{prefixo}travadas` - Mostra o que mais travou o bot recentemente.\n"
+              f"`{prefixo}profiler <comando> [N/tempo]` - Perfila as próximas execuções de um comando.\n"
               f"`{prefixo}resetar` - Reseta TODA a economia (requer confirmação).\n",
         inline=False
     )
@@ -0,0 +1,184 @@
+# metricas.py
+import asyncio
+import bisect
+import logging
+
+import discord
+
+# --- Métricas ---
+# Contadores, histogramas e gauges em memória, servidos no formato texto do Prometheus
+# por um listener HTTP local. Tudo é atualizado pelo event loop, exceto os commits do banco,
+# contados pela própria thread de escrita.
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registro = {} # nome -> métrica, na ordem em que foram criadas
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)) + "}"
+
+
+class Contador:
+    """Valor que só cresce, separado por rótulos (ex: comando, função do banco)."""
+    tipo = "counter"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.valores = {} # tupla de rótulos -> total
+        _registro[nome] = self
+
+    def inc(self, *rotulos, valor=1):
+        self.valores[rotulos] = self.valores.get(rotulos, 0) + valor
+
+    def linhas(self):
+        for rotulos, valor in list(self.valores.items()):
+            yield f"{self.nome}{_rotulos(self.rotulos, rotulos)} {valor}"
+
+
+class Histograma:
+    """Distribuição de durações em buckets fixos (acumulados só na hora de exportar)."""
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = buckets
+        self.valores = {} # tupla de rótulos -> [contagem por bucket..., acima do último, soma]
+        _registro[nome] = self
+
+    def observar(self, valor, *rotulos):
+        serie = self.valores.get(rotulos)
+        if serie is None:
+            serie = self.valores[rotulos] = [0] * (len(self.buckets) + 2)
+        serie[bisect.bisect_left(self.buckets, valor)] += 1
+        serie[-1] += valor
+
+    def linhas(self):
+        nomes = self.rotulos + ("le",)
+        for rotulos, serie in list(self.valores.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie):
+                acumulado += contagem
+                yield f"{self.nome}_bucket{_rotulos(nomes, rotulos + (limite,))} {acumulado}"
+            acumulado += serie[len(self.buckets)]
+            yield f"{self.nome}_bucket{_rotulos(nomes, rotulos + ('+Inf',))} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {serie[-1]}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {acumulado}"
+
+
+class Gauge:
+    """Valor lido na hora da exportação (ex: jogos ativos), a partir de uma função."""
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, funcao):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+        _registro[nome] = self
+
+    def linhas(self):
+        try:
+            valor = self.funcao()
+        except Exception as e:
+            print(f"Erro ao ler a métrica {self.nome}: {e}")
+            return
+        yield f"{self.nome} {valor}"
+
+
+def exportar():
+    """Todas as métricas no formato texto do Prometheus."""
+    linhas = []
+    for metrica in list(_registro.values()):
+        linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+        linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+        linhas.extend(metrica.linhas())
+    return "\n".join(linhas) + "\n"
+
+
+# --- Métricas do Bot ---
+
+COMANDO_DURACAO = Histograma("cassino_comando_duracao_segundos", "Duração dos comandos, do before_invoke ao after_invoke.", ("comando", "resultado"))
+COMANDO_ERROS = Contador("cassino_comando_erros_total", "Erros tratados pelo on_command_error, por tipo.", ("comando", "erro"))
+DB_CHAMADAS = Contador("cassino_db_chamadas_total", "Chamadas às funções do database.py.", ("funcao",))
+DB_COMMITS = Contador("cassino_db_commits_total", "Commits na conexão de escrita, por função do database.py.", ("funcao",))
+DB_DURACAO = Histograma("cassino_db_duracao_segundos", "Duração das chamadas ao banco, incluindo a espera na fila do executor.", ("funcao",))
+DISCORD_REQUISICOES = Contador("cassino_discord_requisicoes_total", "Requisições feitas à API do Discord.", ("metodo", "rota"))
+DISCORD_ERROS = Contador("cassino_discord_erros_total", "Requisições à API do Discord que terminaram em erro HTTP.", ("metodo", "rota", "status"))
+DISCORD_429 = Contador("cassino_discord_429_total", "Respostas 429 (rate limit) recebidas da API do Discord.", ("metodo",))
+LOOP_ATRASO = Histograma("cassino_loop_atraso_segundos", "Atraso do event loop medido pelo watchdog.")
+LOOP_TRAVADAS = Contador("cassino_loop_travadas_total", "Travadas do event loop acima do limite do watchdog, pelo comando que rodava.", ("comando",))
+
+
+class _Contador429(logging.Handler):
+    """O discord.py trata os 429 sozinho e só avisa no log; contamos pelos avisos do logger discord.http."""
+    def emit(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith("We are being rate limited"):
+            DISCORD_429.inc(record.args[0] if record.args else "?")
+
+
+def instrumentar_http(http):
+    """Conta as requisições do cliente HTTP do discord.py (envios, edições, etc.) por método e rota."""
+    if getattr(http, "instrumentado", False):
+        return
+    original = http.request
+
+    async def request(route, **kwargs):
+        DISCORD_REQUISICOES.inc(route.method, route.path)
+        try:
+            return await original(route, **kwargs)
+        except discord.HTTPException as e:
+            DISCORD_ERROS.inc(route.method, route.path, e.status)
+            raise
+
+    http.request = request
+    http.instrumentado = True
+    logging.getLogger("discord.http").addHandler(_Contador429(logging.WARNING))
+
+
+# --- Servidor HTTP ---
+
+class MetricsServer:
+    """Listener HTTP mínimo: GET /metrics devolve exportar()."""
+    def __init__(self, host, porta):
+        self.host = host
+        self.porta = porta
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._atender, self.host, self.porta)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _atender(self, reader, writer):
+        try:
+            requisicao = await asyncio.wait_for(reader.readline(), 5)
+            while await asyncio.wait_for(reader.readline(), 5) not in (b"\r\n", b"\n", b""):
+                pass # Cabeçalhos não interessam
+            partes = requisicao.split()
+            if len(partes) >= 2 and partes[0] == b"GET" and partes[1].split(b"?")[0] in (b"/", b"/metrics"):
+                status, corpo = "200 OK", exportar().encode()
+            else:
+                status, corpo = "404 Not Found", b"Use GET /metrics\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(corpo)}\r\nConnection: close\r\n\r\n".encode() + corpo
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,122 @@
+# profiler.py
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+import discord
+
+# --- Profiler Sob Demanda ---
+# Um admin liga o cProfile e o tracemalloc para as próximas N execuções de um comando, ou por uma
+# janela de tempo, e recebe o relatório como arquivo no canal. Desligado, o custo é um único
+# `if bot.profiler.sessao is not None` nos hooks de comando.
+#
+# O cProfile mede a thread do event loop inteira enquanto uma execução do comando está em andamento,
+# então o que outras tasks fizerem no meio (nos awaits) também entra no relatório. O tracemalloc fica
+# ligado a sessão inteira (desligá-lo apaga os rastros), então as alocações são as do processo todo.
+# Toda sessão, mesmo a por número de execuções, termina em no máximo PROFILER_MAX_SEGUNDOS.
+
+PROFILER_PADRAO = 10           # Execuções medidas quando o admin não diz quantas
+PROFILER_MAX_EXECUCOES = 1000
+PROFILER_MAX_SEGUNDOS = 600
+PROFILER_FUNCOES = 40          # Funções no relatório, por tempo acumulado
+PROFILER_ALOCACOES = 25        # Linhas que mais alocaram memória
+
+_SEM_TRACEMALLOC = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+class SessaoProfiler:
+    def __init__(self, comando, channel, execucoes, segundos):
+        self.comando = comando
+        self.channel = channel
+        self.restantes = execucoes # None quando a sessão é por tempo
+        self.segundos = segundos
+        self.profile = cProfile.Profile()
+        self.em_andamento = 0 # Execuções do comando rodando agora (o cProfile fica ligado enquanto > 0)
+        self.medidas = 0
+        self.inicio = time.monotonic()
+        self.timer = None
+        self.snapshot_inicial = None
+        self.parar_tracemalloc = False
+
+
+class CommandProfiler:
+    """Perfila as próximas execuções de um comando e manda o relatório no canal de quem pediu."""
+    def __init__(self, bot):
+        self.bot = bot
+        self.sessao = None
+
+    def iniciar(self, comando, channel, execucoes=None, segundos=None):
+        sessao = SessaoProfiler(comando, channel, execucoes, segundos)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            sessao.parar_tracemalloc = True
+        sessao.snapshot_inicial = tracemalloc.take_snapshot().filter_traces(_SEM_TRACEMALLOC)
+        # Um comando que quase nunca roda não pode deixar o tracemalloc ligado para sempre
+        sessao.timer = self.bot.timers.agendar(segundos if segundos is not None else PROFILER_MAX_SEGUNDOS, self.encerrar)
+        self.sessao = sessao
+
+    def antes(self, ctx):
+        """Chamado pelo before_invoke (só quando há sessão)."""
+        sessao = self.sessao
+        if ctx.command.qualified_name != sessao.comando or sessao.restantes == 0:
+            return
+        if sessao.restantes is not None:
+            sessao.restantes -= 1
+        ctx.sessao_profiler = sessao
+        if sessao.em_andamento == 0:
+            sessao.profile.enable()
+        sessao.em_andamento += 1
+
+    async def depois(self, ctx):
+        """Chamado pelo after_invoke (só quando há sessão)."""
+        sessao = getattr(ctx, 'sessao_profiler', None)
+        if sessao is None or sessao is not self.sessao:
+            return
+        sessao.em_andamento -= 1
+        sessao.medidas += 1
+        if sessao.em_andamento == 0:
+            sessao.profile.disable()
+            if sessao.restantes == 0:
+                await self.encerrar()
+
+    async def encerrar(self):
+        """Desliga tudo e manda o relatório (também chamado pelo timer da janela de tempo e por `-profiler parar`)."""
+        sessao, self.sessao = self.sessao, None
+        if sessao is None:
+            return
+        sessao.profile.disable()
+        if sessao.timer is not None:
+            sessao.timer.cancelar()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SEM_TRACEMALLOC)
+        if sessao.parar_tracemalloc:
+            tracemalloc.stop()
+
+        relatorio = self._relatorio(sessao, snapshot)
+        arquivo = discord.File(io.BytesIO(relatorio.encode()), filename=f"profile_{sessao.comando}.txt")
+        try:
+            await sessao.channel.send(
+                f"📈 Profiling de `{sessao.comando}` terminado: **{sessao.medidas}** execuções medidas.", file=arquivo
+            )
+        except discord.HTTPException as e:
+            print(f"Erro ao enviar o relatório do profiler: {e}")
+
+    def _relatorio(self, sessao, snapshot):
+        saida = io.StringIO()
+        saida.write(f"Comando: {sessao.comando}\n")
+        saida.write(f"Execuções medidas: {sessao.medidas}\n")
+        saida.write(f"Duração da sessão: {time.monotonic() - sessao.inicio:.1f}s\n\n")
+
+        saida.write(f"=== Top {PROFILER_FUNCOES} funções por tempo acumulado (cProfile) ===\n")
+        try:
+            pstats.Stats(sessao.profile, stream=saida).strip_dirs().sort_stats('cumulative').print_stats(PROFILER_FUNCOES)
+        except TypeError:
+            saida.write("Nenhuma função medida (o comando não rodou durante a sessão).\n")
+
+        saida.write(f"\n=== Top {PROFILER_ALOCACOES} linhas que mais alocaram memória (tracemalloc) ===\n")
+        saida.write("Atenção: diferença do processo inteiro entre o início e o fim da sessão, não só das execuções do comando.\n")
+        diferencas = snapshot.compare_to(sessao.snapshot_inicial, 'lineno')
+        for estatistica in diferencas[:PROFILER_ALOCACOES]:
+            saida.write(f"{estatistica}\n")
+        return saida.getvalue()
@@ -0,0 +1,243 @@
+# simulador.py
+# Simulador de Monte Carlo do retorno ao jogador (RTP) de cada jogo, vetorizado com NumPy.
+# Segue as mesmas regras de pagamento dos comandos (constantes.py), incluindo os arredondamentos para baixo.
+#
+# Uso:
+#   python simulador.py                          # todos os jogos, 10 milhões de rodadas cada
+#   python simulador.py slots crash --taxa 0.03  # só alguns jogos, com outra taxa da casa
+#   python simulador.py --happy-hour             # com o bônus da Happy Hour
+#   python simulador.py --bench                  # benchmark de regressão (semente fixa, rodadas por segundo)
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+from constantes import (
+    CONFIG_PADRAO, JACKPOT_INICIAL, HAPPY_HOUR_MULTIPLICADOR, COIN_MULTIPLICADOR, SLOT_EMOJIS, SLOTS_SIMBOLO_JACKPOT, SLOTS_DEVOLUCAO_PAR,
+    CORES_ROLETA, VALORES_CARTAS, BLACKJACK_PAGAMENTO, BLACKJACK_PAGAMENTO_NATURAL, DEALER_PARA_EM,
+    CRASH_FATOR, CRASH_EXP_MINIMO, CRASH_MINIMO
+)
+
+JOGOS = ('coin', 'dice', 'roleta', 'slots', 'blackjack', 'crash')
+LOTE = 1_000_000          # Rodadas simuladas por vez (limita a memória)
+MAX_CARTAS = 12           # Cartas sorteadas por mão no Blackjack (nenhuma mão real passa disso antes de parar)
+RODADAS_PADRAO = 10_000_000
+RODADAS_BENCH = 5_000_000
+
+
+class Estatisticas:
+    """Acumula os resultados de um jogo lote a lote."""
+    def __init__(self, aposta):
+        self.aposta = aposta
+        self.rodadas = 0
+        self.pago = 0.0      # Soma do que foi creditado (ganhos)
+        self.soma_lucro2 = 0.0
+        self.jackpots = 0
+        self.segundos = 0.0
+
+    def adicionar(self, ganhos):
+        lucro = (ganhos - self.aposta) / self.aposta
+        self.rodadas += len(ganhos)
+        self.pago += float(ganhos.sum())
+        self.soma_lucro2 += float(np.dot(lucro, lucro))
+
+    @property
+    def rtp(self):
+        return self.pago / (self.rodadas * self.aposta)
+
+    @property
+    def variancia(self):
+        """Variância do lucro por rodada, em unidades da aposta."""
+        media = self.rtp - 1
+        return self.soma_lucro2 / self.rodadas - media * media
+
+
+class Simulador:
+    """Gera lotes de rodadas de cada jogo e devolve quanto foi creditado em cada uma (como o `ganhos` dos comandos)."""
+    def __init__(self, args):
+        self.rng = np.random.default_rng(args.seed)
+        self.aposta = args.aposta
+        self.taxa = args.taxa
+        self.bonus = args.multiplicador_hh if args.happy_hour else 1
+        self.args = args
+
+        # Caça-níquel: sorteio por busca na distribuição acumulada dos pesos
+        pesos = np.array([e[1] for e in SLOT_EMOJIS], dtype=np.float64)
+        self.slots_acumulado = np.cumsum(pesos / pesos.sum())
+        self.slots_acumulado[-1] = 1.0
+        self.slots_jackpot = [e[0] for e in SLOT_EMOJIS].index(SLOTS_SIMBOLO_JACKPOT)
+        self.slots_tres = np.array([self._pagamento(e[2]) for e in SLOT_EMOJIS], dtype=np.int64)
+        self.slots_par = math.floor(self.aposta * SLOTS_DEVOLUCAO_PAR)
+        self.contribuicao = math.floor(self.aposta * args.taxa_jackpot)
+        self.jackpot_inicial = args.jackpot
+        self.pote = args.jackpot
+
+        # Roleta: cor de cada número de 0 a 36
+        self.cor_por_numero = np.zeros(37, dtype=bool)
+        self.cor_por_numero[CORES_ROLETA[args.cor]['numeros']] = True
+
+        # Blackjack: baralho infinito (cada carta sorteada com reposição entre os 13 valores)
+        pontos_bj = np.array(list(VALORES_CARTAS.values()), dtype=np.int16)
+        self.as_bj = pontos_bj == 11
+        self.duros_bj = np.where(self.as_bj, 1, pontos_bj).astype(np.int16) # Ás contado como 1
+
+    def _pagamento(self, multiplicador):
+        """Mesma conta dos comandos: multiplicador, bônus da Happy Hour, taxa da casa e arredondamento para baixo."""
+        return math.floor(self.aposta * (multiplicador * self.bonus) * (1 - self.taxa))
+
+    def coin(self, n, stats):
+        venceu = self.rng.random(n) < 0.5
+        return np.where(venceu, self._pagamento(COIN_MULTIPLICADOR), 0)
+
+    def dice(self, n, stats):
+        numero = self.args.dado
+        multiplicador = 1 / ((100 - numero) / 100.0)
+        dado = self.rng.integers(1, 101, n, dtype=np.int8)
+        return np.where(dado > numero, self._pagamento(multiplicador), 0)
+
+    def roleta(self, n, stats):
+        numeros = self.rng.integers(0, 37, n, dtype=np.int8)
+        return np.where(self.cor_por_numero[numeros], self._pagamento(CORES_ROLETA[self.args.cor]['multi']), 0)
+
+    def slots(self, n, stats):
+        colunas = np.searchsorted(self.slots_acumulado, self.rng.random((n, 3)), side='right')
+        a, b, c = colunas[:, 0], colunas[:, 1], colunas[:, 2]
+        tres = (a == b) & (b == c)
+        par = ~tres & ((a == b) | (b == c) | (a == c))
+
+        ganhos = np.where(tres, self.slots_tres[a], 0)
+        ganhos[par] = self.slots_par
+
+        # Jackpot: o pote recebe a contribuição de cada giro (antes do sorteio) e volta ao valor inicial ao ser pago.
+        # O prêmio vem por cima da aposta, então o jogador recebe aposta + pote.
+        acertos = np.flatnonzero(tres & (a == self.slots_jackpot))
+        if len(acertos):
+            inicio_ciclo = np.empty(len(acertos), dtype=np.int64)
+            inicio_ciclo[0] = 0
+            inicio_ciclo[1:] = acertos[:-1] + 1
+            base = np.full(len(acertos), self.jackpot_inicial, dtype=np.int64)
+            base[0] = self.pote
+            ganhos[acertos] = self.aposta + base + self.contribuicao * (acertos - inicio_ciclo + 1)
+            self.pote = self.jackpot_inicial + self.contribuicao * (n - acertos[-1] - 1)
+            stats.jackpots += len(acertos)
+        else:
+            self.pote += self.contribuicao * n
+        return ganhos
+
+    def _mao(self, n, limite):
+        """Compra cartas carta a carta (a partir da 2ª) até o total chegar em `limite`. Só as mãos ainda
+        comprando recebem a próxima carta, e o laço para quando todas pararam (quase sempre antes da 6ª carta).
+        Retorna (total final, 21 com as duas primeiras cartas)."""
+        duros = np.zeros(n, dtype=np.int16)
+        tem_as = np.zeros(n, dtype=bool)
+        ativo = np.ones(n, dtype=bool)
+        natural = None
+        for carta in range(MAX_CARTAS):
+            indices = np.flatnonzero(ativo) if carta >= 2 else slice(None)
+            sorteio = self.rng.integers(0, 13, n if carta < 2 else len(indices), dtype=np.int8)
+            duros[indices] += self.duros_bj[sorteio]
+            tem_as[indices] |= self.as_bj[sorteio]
+            if carta >= 1:
+                # Um Ás vale 11 enquanto não estourar
+                total = np.where(tem_as & (duros <= 11), duros + 10, duros)
+                if carta == 1:
+                    natural = total == 21
+                ativo &= total < limite
+                if not ativo.any():
+                    break
+        return total, natural
+
+    def blackjack(self, n, stats):
+        # Estratégia do jogador: pede carta até `limiar` (ao chegar em 21 o jogo já para sozinho)
+        total_jogador, natural = self._mao(n, min(self.args.limiar, 21))
+        total_dealer, _ = self._mao(n, DEALER_PARA_EM)
+
+        vitoria = (total_jogador <= 21) & ((total_dealer > 21) | (total_jogador > total_dealer))
+        empate = (total_jogador <= 21) & (total_dealer <= 21) & (total_jogador == total_dealer)
+
+        ganhos = np.where(vitoria, self._pagamento(BLACKJACK_PAGAMENTO), 0)
+        ganhos[empate] = self.aposta # Empate devolve a aposta, sem taxa
+        ganhos[natural] = self._pagamento(BLACKJACK_PAGAMENTO_NATURAL) # Pago na hora, sem o dealer jogar
+        return ganhos
+
+    def crash(self, n, stats):
+        # Saque automático em `alvo`: ganha se o foguete explodir depois dele (mesma regra do motor)
+        crash_point = CRASH_FATOR / np.maximum(CRASH_EXP_MINIMO, self.rng.exponential(1.0, n)) + CRASH_MINIMO
+        return np.where(self.args.alvo < crash_point, self._pagamento(self.args.alvo), 0)
+
+    def rodar(self, jogo, rodadas):
+        stats = Estatisticas(self.aposta)
+        gerar = getattr(self, jogo)
+        inicio = time.perf_counter()
+        restantes = rodadas
+        while restantes > 0:
+            n = min(LOTE, restantes)
+            stats.adicionar(gerar(n, stats))
+            restantes -= n
+        stats.segundos = time.perf_counter() - inicio
+        return stats
+
+
+def descrever(jogo, args):
+    if jogo == 'dice':
+        return f"dice (> {args.dado})"
+    if jogo == 'roleta':
+        return f"roleta ({args.cor})"
+    if jogo == 'blackjack':
+        return f"blackjack (pede até {args.limiar})"
+    if jogo == 'crash':
+        return f"crash (alvo {args.alvo:.2f}x)"
+    return jogo
+
+
+def main(argv=None):
+    padrao = CONFIG_PADRAO
+    parser = argparse.ArgumentParser(description="Simulador de RTP dos jogos do Cassino.")
+    parser.add_argument('jogos', nargs='*', help=f"Jogos a simular: {', '.join(JOGOS)} (padrão: todos)")
+    parser.add_argument('--rodadas', type=int, default=None, help=f"Rodadas por jogo (padrão: {RODADAS_PADRAO:,})")
+    parser.add_argument('--aposta', type=int, default=1000, help="Valor de cada aposta (afeta os arredondamentos)")
+    parser.add_argument('--taxa', type=float, default=float(padrao['taxa_casa']), help="Taxa da casa (ex: 0.05)")
+    parser.add_argument('--taxa-jackpot', type=float, default=float(padrao['taxa_jackpot']), help="Fração da aposta que vai para o jackpot")
+    parser.add_argument('--jackpot', type=int, default=JACKPOT_INICIAL, help="Valor inicial do jackpot")
+    parser.add_argument('--happy-hour', action='store_true', help="Aplica o bônus da Happy Hour")
+    parser.add_argument('--multiplicador-hh', type=float, default=HAPPY_HOUR_MULTIPLICADOR, help="Bônus da Happy Hour")
+    parser.add_argument('--dado', type=int, default=50, help="Número escolhido no dice (1-99)")
+    parser.add_argument('--cor', choices=list(CORES_ROLETA), default='vermelho', help="Cor apostada na roleta")
+    parser.add_argument('--alvo', type=float, default=2.0, help="Saque automático no crash")
+    parser.add_argument('--limiar', type=int, default=17, help="No Blackjack, o jogador pede carta até este total")
+    parser.add_argument('--seed', type=int, default=None, help="Semente do gerador (resultados reproduzíveis)")
+    parser.add_argument('--bench', action='store_true', help="Benchmark de regressão: semente fixa, mostra rodadas por segundo")
+    parser.add_argument('--min-velocidade', type=float, default=0, help="Com --bench, sai com erro se algum jogo rodar abaixo disso (rodadas/s)")
+    args = parser.parse_args(argv)
+
+    invalidos = [jogo for jogo in args.jogos if jogo not in JOGOS]
+    if invalidos:
+        parser.error(f"jogo desconhecido: {', '.join(invalidos)}")
+    if not 1 <= args.dado <= 99:
+        parser.error("--dado deve estar entre 1 e 99")
+    if args.bench and args.seed is None:
+        args.seed = 12345
+    rodadas = args.rodadas or (RODADAS_BENCH if args.bench else RODADAS_PADRAO)
+    jogos = args.jogos or JOGOS
+
+    simulador = Simulador(args)
+    print(f"{'Jogo':<26} {'RTP':>8} {'Vantagem':>9} {'Variância':>10} {'Jackpots':>16} {'Rodadas/s':>12}")
+    lentos = []
+    for jogo in jogos:
+        stats = simulador.rodar(jogo, rodadas)
+        velocidade = stats.rodadas / stats.segundos
+        jackpots = f"{stats.jackpots} (1/{stats.rodadas // stats.jackpots:,})" if stats.jackpots else "-"
+        print(f"{descrever(jogo, args):<26} {stats.rtp:>8.2%} {1 - stats.rtp:>9.2%} {stats.variancia:>10.3f} {jackpots:>16} {velocidade:>12,.0f}")
+        if velocidade < args.min_velocidade:
+            lentos.append(jogo)
+
+    if lentos:
+        print(f"Abaixo de {args.min_velocidade:,.0f} rodadas/s: {', '.join(lentos)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
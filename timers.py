@@ -0,0 +1,113 @@
+# timers.py
+import asyncio
+import heapq
+import itertools
+import time
+import traceback
+
+# --- Serviço de Timers ---
+# Um único heap e uma única task para todos os prazos do bot (duelos, rodadas, jogos parados, happy hour).
+# Um prazo pendente custa uma entrada no heap, não uma corrotina suspensa.
+
+COMPACTAR_ACIMA = 1024 # Entradas canceladas toleradas no heap antes de reconstruí-lo
+
+
+class Timer:
+    """Prazo agendado no TimerService. `cancelar()` é O(1): a entrada só é ignorada quando vencer."""
+    __slots__ = ('instante', 'callback', 'args', 'cancelado', 'service')
+
+    def __init__(self, service, instante, callback, args):
+        self.service = service
+        self.instante = instante
+        self.callback = callback
+        self.args = args
+        self.cancelado = False
+
+    def cancelar(self):
+        if not self.cancelado:
+            self.cancelado = True
+            self.service._cancelados += 1
+
+
+class TimerService:
+    """Agenda callbacks (funções ou corrotinas) para um instante de time.monotonic()."""
+    def __init__(self):
+        self.heap = [] # (instante, seq, Timer)
+        self._seq = itertools.count()
+        self._cancelados = 0
+        self._acordar = asyncio.Event()
+        self.task = None
+        self.tarefas = set() # Tasks criadas pelos callbacks: o event loop só guarda referências fracas
+        self.disparados = 0
+
+    def __len__(self):
+        return len(self.heap) - self._cancelados
+
+    def agendar(self, atraso, callback, *args):
+        """Chama `callback(*args)` daqui a `atraso` segundos. Corrotinas viram uma task própria."""
+        return self.agendar_em(time.monotonic() + atraso, callback, *args)
+
+    def agendar_em(self, instante, callback, *args):
+        timer = Timer(self, instante, callback, args)
+        acordar = not self.heap or instante < self.heap[0][0]
+        heapq.heappush(self.heap, (instante, next(self._seq), timer))
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        elif acordar:
+            self._acordar.set()
+        return timer
+
+    def criar_task(self, coro):
+        """Roda `coro` em uma task mantida viva até terminar; a exceção dela, se houver, vai para o log."""
+        task = asyncio.create_task(coro)
+        self.tarefas.add(task)
+        task.add_done_callback(self._task_terminou)
+        return task
+
+    def _task_terminou(self, task):
+        self.tarefas.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Erro em uma task agendada: {task.exception()!r}")
+            traceback.print_exception(task.exception())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _compactar(self):
+        self.heap = [entrada for entrada in self.heap if not entrada[2].cancelado]
+        heapq.heapify(self.heap)
+        self._cancelados = 0
+
+    async def _run(self):
+        while True:
+            if self._cancelados > COMPACTAR_ACIMA and self._cancelados * 2 > len(self.heap):
+                self._compactar()
+
+            if not self.heap:
+                self._acordar.clear()
+                await self._acordar.wait()
+                continue
+
+            espera = self.heap[0][0] - time.monotonic()
+            if espera > 0:
+                self._acordar.clear()
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, timer = heapq.heappop(self.heap)
+            if timer.cancelado:
+                self._cancelados -= 1
+                continue
+            timer.cancelado = True # Já disparou: cancelar depois não faz nada
+            self.disparados += 1
+            try:
+                resultado = timer.callback(*timer.args)
+                if asyncio.iscoroutine(resultado):
+                    self.criar_task(resultado)
+            except Exception as e:
+                print(f"Erro em um timer agendado: {e}")